@@ -0,0 +1,177 @@
+try:
+    import Tkinter as tk
+except ImportError:
+    import tkinter as tk
+
+
+class Board(tk.Canvas):
+    '''
+    Draws whole nonogram - clues and cells - on a single canvas.
+    Every cell is one rectangle item, so even big boards are
+    created at once. Clicks are translated to cells from mouse
+    coordinates and only changed cells are redrawn.
+    '''
+    def __init__(self, parent, rows, columns, size=None):
+        self.rows = rows
+        self.columns = columns
+        self.N = len(columns)
+        self.M = len(rows)
+        self.rclues = max([len(row) for row in rows])
+        self.cclues = max([len(col) for col in columns])
+        if size is None:
+            size = max(8, min(20, 800 // max(self.M + self.cclues,
+                                             self.N + self.rclues)))
+        self.size = size
+        tk.Canvas.__init__(self, parent, background='gray',
+                           highlightthickness=0,
+                           width=(self.N + self.rclues) * size + 1,
+                           height=(self.M + self.cclues) * size + 1)
+        self.defaultbg = parent.cget('bg')
+        self.cells = []
+        self.crosses = {}
+        self.clues = {}
+        self.finished = False
+        self.draw_board()
+
+    def box(self, row, column):
+        '''Returns canvas coordinates of given slot of the board'''
+        return (column * self.size + 1, row * self.size + 1,
+                (column + 1) * self.size, (row + 1) * self.size)
+
+    def draw_board(self):
+        '''
+        Creates rectangles for cells and clue slots
+        and writes clues for rows and columns.
+        '''
+        self.lines = {}
+        for i in range(self.cclues):
+            for j in range(self.rclues):
+                self.create_rectangle(*self.box(i, j), fill='old lace',
+                                      width=0, tags='clue_area')
+        for i in range(self.M):
+            self.lines[('row', i)] = [
+                self.create_rectangle(*self.box(i + self.cclues, j),
+                                      fill='old lace', width=0,
+                                      tags='clue_area')
+                for j in range(self.rclues)]
+        for i in range(self.N):
+            self.lines[('column', i)] = [
+                self.create_rectangle(*self.box(j, i + self.rclues),
+                                      fill='old lace', width=0,
+                                      tags='clue_area')
+                for j in range(self.cclues)]
+        for i in range(self.M):
+            self.cells.append([self.create_rectangle(
+                *self.box(i + self.cclues, j + self.rclues),
+                fill=self.defaultbg, width=0)
+                for j in range(self.N)])
+        self.draw_clues()
+
+    def draw_clues(self):
+        '''Writes clues for rows and columns in black'''
+        self.delete('clue')
+        self.clues = {}
+        font = ('TkDefaultFont', max(6, self.size // 2))
+        for i in range(self.M):
+            for j in range(len(self.rows[i])):
+                x0, y0, x1, y1 = self.box(self.cclues + i,
+                                          self.rclues - j - 1)
+                self.clues[('row', i, j)] = self.create_text(
+                    (x0 + x1) // 2, (y0 + y1) // 2, font=font,
+                    text=str(self.rows[i][-j-1]), tags='clue')
+        for i in range(self.N):
+            for j in range(len(self.columns[i])):
+                x0, y0, x1, y1 = self.box(self.cclues - j - 1,
+                                          self.rclues + i)
+                self.clues[('column', i, j)] = self.create_text(
+                    (x0 + x1) // 2, (y0 + y1) // 2, font=font,
+                    text=str(self.columns[i][-j-1]), tags='clue')
+
+    def locate(self, x, y):
+        '''
+        Converts mouse coordinates to a part of the board:
+        ('cell', row, column), ('row', row, clue) or
+        ('column', column, clue), where clue is counted
+        from the cells. Returns None outside of the board.
+        '''
+        row = int(y // self.size) - self.cclues
+        column = int(x // self.size) - self.rclues
+        if row >= self.M or column >= self.N or \
+           (row < 0 and column < 0):
+            return None
+        if row < 0:
+            return ('column', column, -row - 1)
+        if column < 0:
+            return ('row', row, -column - 1)
+        return ('cell', row, column)
+
+    def draw_cell(self, row, column, state):
+        '''
+        Redraws one cell: 1 - filled, -1 - crossed,
+        0 - empty.
+        '''
+        cross = self.crosses.pop((row, column), None)
+        if cross is not None:
+            self.delete(cross)
+        if state == 1:
+            self.itemconfigure(self.cells[row][column], fill='black')
+            return
+        self.itemconfigure(self.cells[row][column], fill=self.defaultbg)
+        if state == -1:
+            x0, y0, x1, y1 = self.box(row + self.cclues,
+                                      column + self.rclues)
+            self.crosses[(row, column)] = self.create_text(
+                (x0 + x1) // 2, (y0 + y1) // 2, text='x')
+
+    def cross_clue(self, kind, line, clue):
+        '''Turns clue red and black'''
+        item = self.clues.get((kind, line, clue))
+        if item is None:
+            return
+        if self.itemcget(item, 'fill') == 'red':
+            self.itemconfigure(item, fill='black')
+        else:
+            self.itemconfigure(item, fill='red')
+
+    def mark_line(self, kind, line, done, wrong=False):
+        '''
+        Highlights clues of a row or column which is completed
+        or which can't match its clues any more
+        '''
+        self.color_line(kind, line, 'light coral' if wrong else
+                        'pale green' if done else 'old lace')
+
+    def color_line(self, kind, line, color):
+        '''Changes background of clues of a row or column'''
+        for item in self.lines[(kind, line)]:
+            self.itemconfigure(item, fill=color)
+
+    def reset(self, changed):
+        '''
+        Clears given cells (pairs of row and column) and
+        turns all clues black again. After finished game
+        all cells are cleared.
+        '''
+        if self.finished:
+            changed = [(i, j) for i in range(self.M) for j in range(self.N)]
+            self.finished = False
+        for row, column in changed:
+            self.draw_cell(row, column, 0)
+        self.itemconfigure('clue_area', fill='old lace')
+        self.draw_clues()
+
+    def finish(self, matrix):
+        '''
+        Removes crosses and clues, changes color of
+        background, so player can see the picture.
+        '''
+        self.finished = True
+        for cross in self.crosses.values():
+            self.delete(cross)
+        self.crosses = {}
+        self.delete('clue')
+        self.itemconfigure('clue_area', fill='gray')
+        for i in range(self.M):
+            for j in range(self.N):
+                if matrix[i][j] != 1:
+                    self.itemconfigure(self.cells[i][j], fill='gray')
@@ -1,11 +1,17 @@
 import numpy as np
 from random import choice
+from Nonogram.Board import Board
+from Nonogram.Solver import LineTracker, MistakeChecker, \
+    ContradictionError
+from Nonogram.Hints import HintEngine
 try:
     import Tkinter as tk
     from Tkinter import Button
+    import tkMessageBox as box
 except ImportError:
     import tkinter as tk
     from tkinter import Button
+    from tkinter import messagebox as box
 
 
 class ShowNono(tk.Frame):
@@ -16,7 +22,8 @@ class ShowNono(tk.Frame):
     with the mouse. Also it has option to reset nonograms
     and to ask for a hint.
     '''
-    def __init__(self, parent, rows, columns, nonoMatrix, firstStep=[-1, -1]):
+    def __init__(self, parent, rows, columns, nonoMatrix, firstStep=[-1, -1],
+                 givens=()):
         tk.Frame.__init__(self, parent, background="gray")
         self.parent = parent
         self.rows = rows
@@ -24,184 +31,184 @@ class ShowNono(tk.Frame):
         self.N = len(columns)
         self.M = len(rows)
         self.parent.title('[ %d x %d]' % (self.M, self.N))
-        self.rclues = np.max([len(row) for row in rows])
-        self.cclues = np.max([len(col) for col in columns])
-        self.firstStep = firstStep
-        self.create_cells(parent, self.M + self.cclues, self.N + self.rclues)
-        self.width = (self.N + self.rclues) * 10
-        self.height = (self.M + self.cclues) * 10
-        self.parent.geometry('%dx%d' % (self.width * 2, self.height * 2))
+        self.givens = [list(cell) for cell in givens]
+        if firstStep != [-1, -1]:
+            self.givens.append(list(firstStep) + [1])
+        self.create_cells(parent)
+        self.width = int(self.board.cget('width'))
+        self.height = int(self.board.cget('height'))
+        self.parent.geometry('%dx%d' % (self.width, self.height))
         self.pack(side="top", fill="x")
-        self.nonoMatrix = nonoMatrix
+        self.nonoMatrix = np.array(nonoMatrix)
         self.menubar = tk.Menu(self.parent)
         self.menubar.add_command(label="Hint", command=self.get_hint)
         self.menubar.add_command(label="Reset", command=self.reset_game)
         self.menubar.add_command(label="Quit", command=self.parent.destroy)
         self.parent.config(menu=self.menubar)
 
-    def create_cells(self, parent, rows=5, columns=5):
+    def create_cells(self, parent):
         '''
         Creates board where player can L-click to fill,
         R-click to cross cell, and Middle-click set cell
-        empty.
-        '''
-        self.gameMatrix = np.zeros((self.M, self.N))
-        self.widgets = []
-        for row in range(rows):
-            current_row = []
-            for column in range(columns):
-                label = tk.Label(self, borderwidth=0, width=5, text=' ')
-                label.grid(row=row, column=column,
-                           sticky="nsew", padx=1, pady=1)
-                current_row.append(label)
-            self.widgets.append(current_row)
-        for column in range(columns):
-            self.grid_columnconfigure(column, weight=1)
-
-        self.defaultbg = label.cget('bg')
-
-        for i in range(self.M):
-            for j in range(self.N):
-                self.widgets[i + self.cclues][j + self.rclues]\
-                    .bind("<Button-1>", self.fill_cell)
-                self.widgets[i + self.cclues][j + self.rclues]\
-                    .bind("<Button-3>", self.empty_cell)
-                self.widgets[i + self.cclues][j + self.rclues]\
-                    .bind("<Button-2>", self.reset_cell)
-
-        self.create_clues()
-        if self.firstStep != [-1, -1]:
-            self.set_cell(self.firstStep)
-
-    def create_clues(self):
+        empty. L-click on a clue turns it red or black.
         '''
-        Creates labels with clues for cokumns and rows.
-        On L-Click they can be turn red or black
+        self.gameMatrix = np.zeros((self.M, self.N), dtype=np.int8)
+        self.locked = np.zeros((self.M, self.N), dtype=bool)
+        self.board = Board(self, self.rows, self.columns)
+        self.board.pack()
+        self.board.bind("<Button-1>", self.fill_cell)
+        self.board.bind("<Button-3>", self.empty_cell)
+        self.board.bind("<Button-2>", self.reset_cell)
+        self.tracker = LineTracker(self.rows, self.columns)
+        self.checker = MistakeChecker(self.rows, self.columns)
+        self.hints = HintEngine(self.rows, self.columns)
+        self.show_lines()
+        self.place_givens()
+
+    def place_givens(self):
         '''
-        for i in range(self.M):
-            for j in range(len(self.rows[i])):
-                self.widgets[self.cclues + i][-j - self.N - 1]\
-                    .configure(text=str(self.rows[i][-j-1]))
-                self.widgets[self.cclues + i][-j - self.N - 1]\
-                    .bind("<Button-1>", self.cross_clue)
-
-        for i in range(self.N):
-            for j in range(len(self.columns[i])):
-                self.widgets[self.cclues - j - 1][i + self.rclues]\
-                    .configure(text=str(self.columns[i][-j-1]))
-                self.widgets[self.cclues - j - 1][i + self.rclues]\
-                    .bind("<Button-1>", self.cross_clue)
-
-        for i in range(self.rclues):
-            for j in range(self.M + self.cclues):
-                self.widgets[j][i].configure(bg='old lace')
-
-        for i in range(self.cclues):
-            for j in range(self.rclues + self.N):
-                self.widgets[i][j].configure(bg='old lace')
+        Puts given cells (row, column, value) on the board; with
+        them the picture can be solved line by line.
+        '''
+        for row, column, value in self.givens:
+            if value == 1:
+                self.set_cell((row, column))
+            else:
+                self.cut_cell((row, column))
 
     def set_cell(self, position):
         '''Fills cell with given position - used by Hint button.'''
-        self.widgets[position[0] + self.cclues][position[1] + self.rclues]\
-            .configure(bg='black', state='disabled', text='  ')
-        self.gameMatrix[position[0]][position[1]] = 1
+        self.mark(position[0], position[1], 1)
+        self.locked[position[0]][position[1]] = True
 
     def cut_cell(self, position):
         '''Empties cell with given position - used by Hint button.'''
-        self.widgets[position[0] + self.cclues][position[1] + self.rclues]\
-            .configure(bg=self.defaultbg, text='x', state='disabled')
-        self.gameMatrix[position[0]][position[1]] = 0
-
-    def cross_clue(self, event):
-        '''Turns clue red and black'''
-        if event.widget.cget('fg') == 'red':
-            event.widget.config(fg='black')
-        else:
-            event.widget.config(fg='red')
+        self.mark(position[0], position[1], -1)
+        self.locked[position[0]][position[1]] = True
+
+    def mark(self, row, column, state):
+        '''
+        Sets state of one cell (1 - filled, -1 - crossed,
+        0 - empty) and redraws only this cell.
+        '''
+        self.gameMatrix[row][column] = state
+        self.board.draw_cell(row, column, state)
+        changes = self.tracker.update(self.gameMatrix, row, column) + \
+            self.checker.update(self.gameMatrix, row, column)
+        for kind, line, _ in changes:
+            self.paint_line(kind, line)
+
+    def flash_line(self, kind, line):
+        '''Highlights clues of a line which proves the hint for a while'''
+        self.board.color_line(kind, line, 'light sky blue')
+        self.after(800, lambda: self.paint_line(kind, line))
+
+    def paint_line(self, kind, line):
+        '''
+        Colors clues of a line: red when cells of player can't
+        match them, green when the line is completed
+        '''
+        done = self.tracker.rowsDone[line] if kind == 'row' \
+            else self.tracker.columnsDone[line]
+        self.board.mark_line(kind, line, done,
+                             (kind, line) in self.checker.wrong)
+
+    def show_lines(self):
+        '''Highlights clues of every line which is already completed'''
+        for i in range(self.M):
+            self.paint_line('row', i)
+        for i in range(self.N):
+            self.paint_line('column', i)
+
+    def click(self, event, state):
+        '''
+        Finds clicked part of the board. Clues are crossed,
+        cells which are not locked get given state.
+        '''
+        place = self.board.locate(event.x, event.y)
+        if place is None:
+            return
+        if place[0] != 'cell':
+            if state == 1:
+                self.board.cross_clue(*place)
+            return
+        if not self.locked[place[1]][place[2]]:
+            self.mark(place[1], place[2], state)
+            if self.is_game_over():
+                self.end_game()
 
     def fill_cell(self, event):
         '''Fills clicked cell black'''
-        if event.widget.cget('state') != 'disabled':
-            event.widget.configure(bg='black')
-            x = int(event.widget.winfo_y()/18) - self.cclues
-            y = int(event.widget.winfo_x()/19) - self.rclues
-            self.gameMatrix[min([x, len(self.gameMatrix)-1])]\
-                           [min([y, len(self.gameMatrix[0])-1])] = 1
-
-        if self.is_game_over():
-            self.end_game()
+        self.click(event, 1)
 
     def empty_cell(self, event):
         '''Crosses clicked cell'''
-        if event.widget.cget('state') != 'disabled':
-            event.widget.configure(text='x', bg=self.defaultbg)
-            x = int(event.widget.winfo_y()/18) - self.cclues
-            y = int(event.widget.winfo_x()/19) - self.rclues
-            self.gameMatrix[min([x, len(self.gameMatrix)-1])]\
-                           [min([y, len(self.gameMatrix[0])-1])] = 0
-
-        if self.is_game_over():
-            self.end_game()
+        self.click(event, -1)
 
     def reset_cell(self, event):
         '''Empties clicked cell'''
-        if event.widget.cget('state') != 'disabled':
-            event.widget.configure(bg=self.defaultbg, text='  ')
-            x = int(event.widget.winfo_y()/18) - self.cclues
-            y = int(event.widget.winfo_x()/19) - self.rclues
-            self.gameMatrix[min([x, len(self.gameMatrix)-1])]\
-                           [min([y, len(self.gameMatrix[0])-1])] = 0
-
-        if self.is_game_over():
-            self.end_game()
+        self.click(event, 0)
 
     def reset_game(self):
         '''Resets whole board, so player can play again'''
-        self.gameMatrix = np.zeros((self.M, self.N))
-        for i in range(self.M + self.cclues):
-            for j in range(self.N + self.rclues):
-                self.widgets[i][j].configure(bg=self.defaultbg,
-                                             text='  ', fg='black',
-                                             state='normal')
-        self.create_clues()
-        if self.firstStep != [-1, -1]:
-            self.set_cell(self.firstStep)
+        changed = list(zip(*np.nonzero(self.gameMatrix)))
+        self.gameMatrix = np.zeros((self.M, self.N), dtype=np.int8)
+        self.locked = np.zeros((self.M, self.N), dtype=bool)
+        self.board.reset(changed)
+        self.tracker.reset()
+        self.checker.reset()
+        self.show_lines()
+        self.place_givens()
 
     def get_hint(self):
         '''
-        Fill random empty cell that should be filled or
-        if every filled cells are filled by player, empties
-        filled cell that shouldn't be filled
+        Shows next cell which follows from clues and cells on
+        the board and highlights line which proves it. If no
+        such cell exists, fills random empty cell that should
+        be filled or if every filled cells are filled by player,
+        empties filled cell that shouldn't be filled
         '''
-        if not self.is_game_over():
-            diff = self.gameMatrix - self.nonoMatrix
-            if len(np.where(diff == -1)[0]):
-                hint = choice(list(zip(np.where(diff == -1)[0],
-                                       np.where(diff == -1)[1])))
+        if self.is_game_over():
+            return
+        try:
+            hint = self.hints.hint(self.gameMatrix)
+        except ContradictionError as error:
+            box.showinfo('', 'There is a mistake in %s %d.'
+                         % (error.kind, error.number + 1))
+            return
+        if hint is not None:
+            row, column, value, line = hint
+            if value == 1:
+                self.set_cell((row, column))
+            else:
+                self.cut_cell((row, column))
+            self.flash_line(*line)
+        else:
+            missing = (self.nonoMatrix == 1) & (self.gameMatrix != 1)
+            wrong = (self.nonoMatrix == -1) & (self.gameMatrix == 1)
+            if missing.any():
+                hint = choice(list(zip(*np.nonzero(missing))))
                 self.set_cell(hint)
 
-            else:
-                hint = choice(list(zip(np.where(diff == 2)[0],
-                                       np.where(diff == 2)[1])))
+            elif wrong.any():
+                hint = choice(list(zip(*np.nonzero(wrong))))
                 self.cut_cell(hint)
 
-            if self.is_game_over():
-                self.end_game()
+        if self.is_game_over():
+            self.end_game()
 
     def is_game_over(self):
         '''
-        Checks whether matrix generated by board is the same
-        as matrix given at initializing
+        Checks whether every row and column of the board
+        matches its clues - status of lines is updated
+        after every click.
         '''
-        return(((self.gameMatrix * 2) - 1 == self.nonoMatrix).all())
+        return self.tracker.done()
 
     def end_game(self):
         '''
         Diables cells, changes color of background,
         so player can see the picture he just played
         '''
-        for i in range(self.M + self.cclues):
-            for j in range(self.N + self.rclues):
-                self.widgets[i][j].configure(text='  ', state='disabled')
-                if self.widgets[i][j].cget('bg') != 'black':
-                    self.widgets[i][j].configure(bg='gray')
+        self.locked[:] = True
+        self.board.finish(self.gameMatrix)
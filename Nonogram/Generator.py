@@ -0,0 +1,128 @@
+from Nonogram.Solver import nonogram, matrix_clues, picture_to_matrix, \
+    clues_to_text
+import multiprocessing
+import numpy as np
+
+
+def random_grid(height, width, density=0.5, random=np.random):
+    """Returns random matrix with 1 as filled and -1 as empty cell"""
+    return np.where(random.random_sample((height, width)) < density, 1, -1)
+
+
+def unknown_cells(grid):
+    """
+    Solves nonogram made from grid with line solver.
+    Returns matrix of cells which stayed unknown
+    and number of rounds solver needed.
+    """
+    NG = nonogram(*matrix_clues(grid))
+    NG.solve()
+    return np.array(NG.nonogram_Matrix) == 0, NG.rounds
+
+
+def make_unique(grid, random=np.random, repairs=None):
+    """
+    Changes grid until nonogram made from it can be solved with line
+    solver (so it has unique solution). Instead of drawing new grid,
+    it flips one of cells which solver couldn't decide and tries
+    again. Returns (grid, rounds) or None when it didn't succeed
+    after given number of repairs.
+    """
+    grid = np.array(grid)
+    if repairs is None:
+        repairs = grid.size
+    for _ in range(repairs + 1):
+        unknown, rounds = unknown_cells(grid)
+        if not unknown.any():
+            return grid, rounds
+        cells = np.transpose(np.nonzero(unknown))
+        i, j = cells[random.randint(len(cells))]
+        grid[i][j] = -grid[i][j]
+    return None
+
+
+def generate_one(task):
+    """
+    Generates one unique nonogram for generate. Task is tuple
+    (seed, height, width, density, noise, min_rounds, max_rounds,
+    picture, attempts). Returns (Rows, Columns, rounds), or None
+    when no nonogram with given rounds was found in given number
+    of attempts.
+    """
+    seed, height, width, density, noise, min_rounds, max_rounds, \
+        picture, attempts = task
+    random = np.random.RandomState(seed)
+    for _ in range(attempts):
+        if picture is None:
+            grid = random_grid(height, width, density, random)
+        else:
+            grid = picture.copy()
+            flips = random.random_sample(grid.shape) < noise
+            grid[flips] = -grid[flips]
+        result = make_unique(grid, random)
+        if result is None:
+            continue
+        grid, rounds = result
+        if rounds >= min_rounds and (max_rounds is None or
+                                     rounds <= max_rounds):
+            Rows, Columns = matrix_clues(grid)
+            return Rows, Columns, rounds
+    return None
+
+
+def generate(count, height=15, width=15, density=0.5, min_rounds=1,
+             max_rounds=None, image=None, seed=0, processes=None,
+             file=None, noise=0.05, attempts=100):
+    """
+    Generates count nonograms with unique solution in parallel.
+    Difficulty is given as number of rounds line solver needs
+    (min_rounds, max_rounds). Grids are random with given density
+    of filled cells, or come from image (then noise is the part of
+    cells of the picture which are flipped). Every nonogram gets
+    given number of attempts (grids); when rounds can't be reached
+    in them, it is left out, so fewer nonograms can be returned.
+    Nonograms are written to file in the format read by
+    import_from_file.
+    Returns list of (Rows, Columns, rounds).
+    """
+    picture = None
+    if image is not None:
+        picture = picture_to_matrix(image, height, width)
+        height, width = picture.shape
+    tasks = [(seed + n, height, width, density, noise, min_rounds,
+              max_rounds, picture, attempts) for n in range(count)]
+    with multiprocessing.Pool(processes) as pool:
+        nonograms = [nonogram for nonogram in
+                     pool.map(generate_one, tasks,
+                              chunksize=max(1, count // 64))
+                     if nonogram is not None]
+    if file is not None:
+        with open(file, 'w') as f:
+            f.write('\n\n'.join(clues_to_text(Rows, Columns)
+                                for Rows, Columns, _ in nonograms))
+    return nonograms
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Generates nonograms '
+                                     'with unique solution')
+    parser.add_argument('count', type=int)
+    parser.add_argument('file')
+    parser.add_argument('--rows', type=int, default=15)
+    parser.add_argument('--columns', type=int, default=15)
+    parser.add_argument('--density', type=float, default=0.5)
+    parser.add_argument('--noise', type=float, default=0.05)
+    parser.add_argument('--attempts', type=int, default=100)
+    parser.add_argument('--min-rounds', type=int, default=1)
+    parser.add_argument('--max-rounds', type=int, default=None)
+    parser.add_argument('--image', default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    nonograms = generate(args.count, args.rows, args.columns, args.density,
+                         args.min_rounds, args.max_rounds, args.image,
+                         args.seed, file=args.file, noise=args.noise,
+                         attempts=args.attempts)
+    if len(nonograms) < args.count:
+        print('Only %d nonograms with given rounds were found'
+              % len(nonograms))
@@ -0,0 +1,87 @@
+import numpy as np
+
+
+class PackedGrid:
+    """
+    Picture with 1 for filled, -1 for empty and 0 for unknown cell
+    kept in 2 bits per cell: one bit plane says which cells are known
+    and the other which of them are filled, both packed together with
+    np.packbits. It can be made from list of lists or numpy array and
+    works with numpy functions (np.asarray gives int8 matrix). It is
+    pickled as shape and bytes, so it is cheap to send to other
+    processes and to keep in caches.
+
+    It is meant only for storing and sending finished pictures:
+    solutions in Index, results of Server workers (and its cache)
+    and nonogram.grid(). Solver state, ClueVerifier and GUI keep
+    plain lists and arrays, because reading single cells from
+    packed bits is slower than from a list; they accept PackedGrid
+    where a matrix is given, as it turns into array with np.asarray.
+
+    >>> grid = PackedGrid([[1, -1, 0], [0, 1, 1]])
+    >>> grid.tolist()
+    [[1, -1, 0], [0, 1, 1]]
+    >>> grid.shape, grid[1, 2], len(grid.to_bytes())
+    ((2, 3), 1, 2)
+    """
+    __slots__ = ('shape', 'data')
+
+    def __init__(self, matrix):
+        matrix = np.asarray(matrix)
+        if matrix.size == 0:
+            matrix = matrix.reshape(len(matrix), 0)
+        self.shape = (int(matrix.shape[0]), int(matrix.shape[1]))
+        self.data = np.packbits(np.concatenate([(matrix != 0).ravel(),
+                                                (matrix > 0).ravel()]))
+
+    @classmethod
+    def from_bytes(cls, shape, data):
+        """Makes grid from shape and bytes given by to_bytes"""
+        grid = cls.__new__(cls)
+        grid.shape = tuple(shape)
+        grid.data = np.frombuffer(data, dtype=np.uint8)
+        return grid
+
+    def to_bytes(self):
+        """Returns packed cells as bytes"""
+        return self.data.tobytes()
+
+    def to_matrix(self):
+        """Returns cells as numpy int8 matrix"""
+        size = self.shape[0] * self.shape[1]
+        bits = np.unpackbits(self.data, count=2 * size).astype(np.int8)
+        return (bits[:size] * (2 * bits[size:] - 1)).reshape(self.shape)
+
+    def tolist(self):
+        """Returns cells as list of lists of ints"""
+        return self.to_matrix().tolist()
+
+    def __array__(self, dtype=None, copy=None):
+        matrix = self.to_matrix()
+        return matrix if dtype is None else matrix.astype(dtype)
+
+    def __getitem__(self, cell):
+        i, j = cell
+        place = i * self.shape[1] + j
+        size = self.shape[0] * self.shape[1]
+        known, filled = (int(self.data[bit >> 3] >> (7 - (bit & 7))) & 1
+                         for bit in (place, size + place))
+        return known * (2 * filled - 1)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __eq__(self, other):
+        if not isinstance(other, PackedGrid):
+            return NotImplemented
+        return self.shape == other.shape and \
+            self.to_bytes() == other.to_bytes()
+
+    def __hash__(self):
+        return hash((self.shape, self.to_bytes()))
+
+    def __reduce__(self):
+        return PackedGrid.from_bytes, (self.shape, self.to_bytes())
+
+    def __repr__(self):
+        return 'PackedGrid(%r)' % self.tolist()
@@ -1,5 +1,9 @@
 import numpy as np
-from Nonogram.Solver import row_to_clues
+from Nonogram.Solver import LineTracker, MistakeChecker, \
+    ContradictionError
+from Nonogram.Hints import HintEngine
+from Nonogram.SAT import SatNonogram
+from Nonogram.Board import Board
 try:
     import Tkinter as tk
     from Tkinter import Button
@@ -25,148 +29,205 @@ class ShowNonoHard(tk.Frame):
         self.N = len(columns)
         self.M = len(rows)
         self.parent.title('[ %d x %d] Hard' % (self.M, self.N))
-        self.rclues = np.max([len(row) for row in rows])
-        self.cclues = np.max([len(col) for col in columns])
-        self.create_cells(parent, self.M + self.cclues, self.N + self.rclues)
-        self.width = (self.N + self.rclues) * 10
-        self.height = (self.M + self.cclues) * 10
-        self.parent.geometry('%dx%d' % (self.width * 2 - 10,
-                                        self.height * 2 + 15))
+        self.create_cells(parent)
+        self.width = int(self.board.cget('width'))
+        self.height = int(self.board.cget('height'))
+        self.parent.geometry('%dx%d' % (self.width, self.height))
         self.pack(side="top", fill="x")
         self.menubar = tk.Menu(self.parent)
+        self.menubar.add_command(label="Hint", command=self.get_hint)
+        self.menubar.add_command(label="Solve", command=self.show_solving)
         self.menubar.add_command(label="Reset", command=self.reset_game)
         self.menubar.add_command(label="Quit", command=self.parent.destroy)
         self.parent.config(menu=self.menubar)
         box.showinfo('', '''                    This is a little bit harder nonogram.
-                    Our algorithm couldn\'t solve it so you don\'t
-                    have any hints. Maybe you will solve it without
-                    our help! :)''')
+                    Our algorithm couldn\'t solve it line by line,
+                    so some hints need a search through all pictures
+                    matching your board and can take a while.
+                    Maybe you will solve it without our help! :)''')
 
-    def create_cells(self, parent, rows=5, columns=5):
+    def create_cells(self, parent):
         '''
         Creates board where player can L-click to fill,
         R-click to cross cell, and Middle-click set cell
-        empty.
-        '''
-        self.gameMatrix = np.zeros((self.M, self.N))
-        self.widgets = []
-        for row in range(rows):
-            current_row = []
-            for column in range(columns):
-                label = tk.Label(self, borderwidth=0, width=5, text=' ')
-                label.grid(row=row, column=column, sticky="nsew",
-                           padx=1, pady=1)
-                current_row.append(label)
-            self.widgets.append(current_row)
-        for column in range(columns):
-            self.grid_columnconfigure(column, weight=1)
-
-        self.defaultbg = label.cget('bg')
+        empty. L-click on a clue turns it red or black.
+        '''
+        self.gameMatrix = np.zeros((self.M, self.N), dtype=np.int8)
+        self.over = False
+        self.board = Board(self, self.rows, self.columns)
+        self.board.pack()
+        self.board.bind("<Button-1>", self.fill_cell)
+        self.board.bind("<Button-3>", self.empty_cell)
+        self.board.bind("<Button-2>", self.reset_cell)
+        self.tracker = LineTracker(self.rows, self.columns)
+        self.checker = MistakeChecker(self.rows, self.columns)
+        self.hints = HintEngine(self.rows, self.columns)
+        self.sat = None
+        self.solving = False
+        self.show_lines()
+
+    def mark(self, row, column, state):
+        '''
+        Sets state of one cell (1 - filled, -1 - crossed,
+        0 - empty) and redraws only this cell.
+        '''
+        self.gameMatrix[row][column] = state
+        self.board.draw_cell(row, column, state)
+        changes = self.tracker.update(self.gameMatrix, row, column) + \
+            self.checker.update(self.gameMatrix, row, column)
+        for kind, line, _ in changes:
+            self.paint_line(kind, line)
+
+    def flash_line(self, kind, line):
+        '''Highlights clues of a line which proves the hint for a while'''
+        self.board.color_line(kind, line, 'light sky blue')
+        self.after(800, lambda: self.paint_line(kind, line))
+
+    def paint_line(self, kind, line):
+        '''
+        Colors clues of a line: red when cells of player can't
+        match them, green when the line is completed
+        '''
+        done = self.tracker.rowsDone[line] if kind == 'row' \
+            else self.tracker.columnsDone[line]
+        self.board.mark_line(kind, line, done,
+                             (kind, line) in self.checker.wrong)
 
+    def show_lines(self):
+        '''Highlights clues of every line which is already completed'''
         for i in range(self.M):
-            for j in range(self.N):
-                self.widgets[i + self.cclues][j + self.rclues]\
-                    .bind("<Button-1>", self.fill_cell)
-                self.widgets[i + self.cclues][j + self.rclues]\
-                    .bind("<Button-3>", self.empty_cell)
-                self.widgets[i + self.cclues][j + self.rclues]\
-                    .bind("<Button-2>", self.reset_cell)
-
-        self.create_clues()
+            self.paint_line('row', i)
+        for i in range(self.N):
+            self.paint_line('column', i)
 
-    def create_clues(self):
+    def click(self, event, state):
         '''
-        Creates labels with clues for cokumns and rows.
-        On L-Click they can be turn red or black
+        Finds clicked part of the board. Clues are crossed,
+        cells get given state.
         '''
-        for i in range(self.M):
-            for j in range(len(self.rows[i])):
-                self.widgets[self.cclues + i][-j - self.N - 1]\
-                    .configure(text=str(self.rows[i][-j-1]))
-                self.widgets[self.cclues + i][-j - self.N - 1]\
-                    .bind("<Button-1>", self.cross_clue)
-
-        for i in range(self.N):
-            for j in range(len(self.columns[i])):
-                self.widgets[self.cclues - j - 1][i + self.rclues]\
-                    .configure(text=str(self.columns[i][-j-1]))
-                self.widgets[self.cclues - j - 1][i + self.rclues]\
-                    .bind("<Button-1>", self.cross_clue)
-
-        for i in range(self.rclues):
-            for j in range(self.M + self.cclues):
-                self.widgets[j][i].configure(bg='old lace')
-
-        for i in range(self.cclues):
-            for j in range(self.rclues + self.N):
-                self.widgets[i][j].configure(bg='old lace')
-
-    def cross_clue(self, event):
-        '''Turns clue red and black'''
-        if event.widget.cget('fg') == 'red':
-            event.widget.config(fg='black')
-        else:
-            event.widget.config(fg='red')
+        place = self.board.locate(event.x, event.y)
+        if place is None or self.over:
+            return
+        if place[0] != 'cell':
+            if state == 1:
+                self.board.cross_clue(*place)
+            return
+        self.mark(place[1], place[2], state)
+        if self.is_game_over():
+            self.end_game()
 
     def fill_cell(self, event):
         '''Fills clicked cell black'''
-        if event.widget.cget('state') != 'disabled':
-            event.widget.configure(bg='black')
-            x = int(event.widget.winfo_y()/18) - self.cclues
-            y = int(event.widget.winfo_x()/19) - self.rclues
-            self.gameMatrix[min([x, len(self.gameMatrix)-1])]\
-                           [min([y, len(self.gameMatrix[0])-1])] = 1
-        if self.is_game_over():
-            self.end_game()
+        self.click(event, 1)
 
     def empty_cell(self, event):
         '''Crosses clicked cell'''
-        if event.widget.cget('state') != 'disabled':
-            event.widget.configure(text='x', bg=self.defaultbg)
-            x = int(event.widget.winfo_y()/18) - self.cclues
-            y = int(event.widget.winfo_x()/19) - self.rclues
-            self.gameMatrix[min([x, len(self.gameMatrix)-1])]\
-                           [min([y, len(self.gameMatrix[0])-1])] = 0
-        if self.is_game_over():
-            self.end_game()
+        self.click(event, -1)
 
     def reset_cell(self, event):
         '''Empties clicked cell'''
-        if event.widget.cget('state') != 'disabled':
-            event.widget.configure(bg=self.defaultbg, text='  ')
-            x = int(event.widget.winfo_y()/18) - self.cclues
-            y = int(event.widget.winfo_x()/19) - self.rclues
-            self.gameMatrix[min([x, len(self.gameMatrix)-1])]\
-                           [min([y, len(self.gameMatrix[0])-1])] = 0
-        if self.is_game_over():
-            self.end_game()
+        self.click(event, 0)
 
     def reset_game(self):
         '''Resets whole board, so player can play again'''
-        self.gameMatrix = np.zeros((self.M, self.N))
-        for i in range(self.M + self.cclues):
-            for j in range(self.N + self.rclues):
-                self.widgets[i][j].configure(bg=self.defaultbg, text='  ',
-                                             fg='black', state='normal')
-        self.create_clues()
+        changed = list(zip(*np.nonzero(self.gameMatrix)))
+        self.gameMatrix = np.zeros((self.M, self.N), dtype=np.int8)
+        self.over = False
+        self.board.reset(changed)
+        self.tracker.reset()
+        self.checker.reset()
+        self.show_lines()
+
+    def get_hint(self):
+        '''
+        Shows next cell which follows from clues and cells on
+        the board and highlights line which proves it.
+        '''
+        if self.over:
+            return
+        try:
+            hint = self.hints.hint(self.gameMatrix)
+        except ContradictionError as error:
+            box.showinfo('', 'There is a mistake in %s %d.'
+                         % (error.kind, error.number + 1))
+            return
+        if hint is None:
+            try:
+                hint = self.search_hint()
+            except ValueError:
+                box.showinfo('', 'There is a mistake on your board.')
+                return
+        if hint is None:
+            box.showinfo('', 'No cell follows from your board. '
+                             'Try to guess one!')
+            return
+        row, column, value, line = hint
+        self.mark(row, column, value)
+        if line is not None:
+            self.flash_line(*line)
+        if self.is_game_over():
+            self.end_game()
+
+    def show_solving(self):
+        '''
+        Shows line solver at work, starting from the board: every
+        300 ms cells proved by next line appear and the line is
+        highlighted. Solver does only the steps which are shown,
+        so choosing Solve again stops it at once.
+        '''
+        self.solving = not self.solving
+        if self.solving:
+            self.solve_step()
+
+    def solve_step(self):
+        '''Shows one step of show_solving and plans the next one'''
+        if not self.solving or self.over:
+            self.solving = False
+            return
+        try:
+            step = self.hints.line_hint(self.gameMatrix)
+        except ContradictionError as error:
+            self.solving = False
+            box.showinfo('', 'There is a mistake in %s %d.'
+                         % (error.kind, error.number + 1))
+            return
+        if step is None:
+            self.solving = False
+            box.showinfo('', 'No more cells follow from your board.')
+            return
+        cells, line = step
+        for row, column, value in cells:
+            self.mark(row, column, value)
+        self.flash_line(*line)
+        if self.is_game_over():
+            self.solving = False
+            self.end_game()
+            return
+        self.after(300, self.solve_step)
+
+    def search_hint(self):
+        '''
+        Finds cell which is the same in every picture matching
+        clues and the board (with SAT solver) when line solver
+        finds nothing. Returns (row, column, value, None) or None.
+        '''
+        if self.sat is None:
+            self.sat = SatNonogram(self.rows, self.columns)
+        hint = self.sat.forced(self.gameMatrix.tolist())
+        return None if hint is None else hint + (None,)
 
     def is_game_over(self):
         '''
         Checks whether picture generates same clues
-        as ones given during initializing.
+        as ones given during initializing - status of
+        lines is updated after every click.
         '''
-        gameMatrix = 2 * self.gameMatrix - 1
-        matrixRows = [row_to_clues(x) for x in np.array(gameMatrix)]
-        matrixCols = [row_to_clues(x) for x in np.array(gameMatrix).T]
-        return matrixRows == self.rows and matrixCols == self.columns
+        return self.tracker.done()
 
     def end_game(self):
         '''
         Diables cells, changes color of background,
         so player can see the picture he just played
         '''
-        for i in range(self.M + self.cclues):
-            for j in range(self.N + self.rclues):
-                self.widgets[i][j].configure(text='  ', state='disabled')
-                if self.widgets[i][j].cget('bg') != 'black':
-                    self.widgets[i][j].configure(bg='gray')
+        self.over = True
+        self.board.finish(self.gameMatrix)
@@ -0,0 +1,87 @@
+from Nonogram.Solver import nonogram, ContradictionError
+import numpy as np
+
+
+class HintEngine:
+    """
+    Finds hints with line solver, starting from cells which
+    player already filled or crossed. Solver state is kept
+    between hints, so next hint continues propagation where
+    previous one stopped instead of solving whole nonogram
+    again. It needs no solution, so it works for hard
+    nonograms too.
+    """
+    def __init__(self, Rows, Columns):
+        self.Rows = Rows
+        self.Columns = Columns
+        self.restart()
+
+    def restart(self):
+        """Forgets all deductions and player's cells"""
+        self.nonogram = nonogram(self.Rows, self.Columns)
+        self.known = np.zeros((self.nonogram.height, self.nonogram.width),
+                              dtype=np.int8)
+        self.found = []
+        self.nonogram.push_all()
+
+    def add_cells(self, gameMatrix):
+        """
+        Passes new cells of player to solver. If player changed
+        cell which was already passed, solving starts from scratch.
+        Raises ContradictionError when they don't match clues.
+        """
+        board = np.asarray(gameMatrix)
+        if ((self.known != 0) & (board != self.known)).any():
+            self.restart()
+        for i, j in zip(*np.nonzero((board != 0) & (self.known == 0))):
+            self.nonogram.set_cell(i, j, board[i][j])
+            self.known[i][j] = board[i][j]
+            self.nonogram.push(('row', i))
+            self.nonogram.push(('column', j))
+
+    def hint(self, gameMatrix):
+        """
+        Returns next cell that can be deduced from player's board
+        as (row, column, value, line), where value is 1 for filled
+        and -1 for empty cell and line is ('row', number) or
+        ('column', number) which proves it. Returns None if no cell
+        can be deduced with line solver.
+        Raises ContradictionError if player's board is wrong.
+        """
+        try:
+            return self.next_hint(gameMatrix)
+        except ContradictionError:
+            self.restart()
+            raise
+
+    def line_hint(self, gameMatrix):
+        """
+        Like hint, but returns every new cell proved by the same
+        line as (cells, line), where cells are (row, column, value).
+        Returns None if no cell can be deduced with line solver.
+        """
+        hint = self.hint(gameMatrix)
+        if hint is None:
+            return None
+        cells = [(i, j, value) for i, j, value, _ in self.found
+                 if self.known[i][j] != value and gameMatrix[i][j] != value]
+        return cells, hint[3]
+
+    def next_hint(self, gameMatrix):
+        """
+        Takes steps of solver (see nonogram.solve_steps) only until
+        new cell is found; the rest of the queue waits for next hint
+        """
+        self.add_cells(gameMatrix)
+        steps = self.nonogram.solve_steps([])
+        while True:
+            for deduction in self.found:
+                i, j, value, line = deduction
+                if self.known[i][j] != value:
+                    return deduction
+            step = next(steps, None)
+            if step is None:
+                self.found = []
+                return None
+            self.found = [(i, j, value, step.line)
+                          for i, j, value in step.cells]
@@ -0,0 +1,186 @@
+from Nonogram.Grid import PackedGrid
+import numpy as np
+import hashlib
+
+SYMMETRIES = [(flipRows, flipCols, transpose)
+              for transpose in (False, True)
+              for flipRows in (False, True)
+              for flipCols in (False, True)]
+
+
+def transform_clues(Rows, Columns, symmetry):
+    """
+    Returns clues of the picture mirrored upside down (flipRows),
+    mirrored left to right (flipCols) and then transposed.
+
+    >>> transform_clues([[2], [1]], [[1], [2]], (False, True, False))
+    ([[2], [1]], [[2], [1]])
+    """
+    flipRows, flipCols, transpose = symmetry
+    if flipRows:
+        Rows, Columns = Rows[::-1], [col[::-1] for col in Columns]
+    if flipCols:
+        Rows, Columns = [row[::-1] for row in Rows], Columns[::-1]
+    if transpose:
+        Rows, Columns = Columns, Rows
+    return [list(row) for row in Rows], [list(col) for col in Columns]
+
+
+def transform_matrix(matrix, symmetry):
+    """Changes matrix the same way transform_clues changes clues"""
+    flipRows, flipCols, transpose = symmetry
+    matrix = np.asarray(matrix)
+    if flipRows:
+        matrix = matrix[::-1]
+    if flipCols:
+        matrix = matrix[:, ::-1]
+    return matrix.T if transpose else matrix
+
+
+def undo_matrix(matrix, symmetry):
+    """Reverts transform_matrix"""
+    flipRows, flipCols, transpose = symmetry
+    return transform_matrix(np.asarray(matrix).T if transpose else matrix,
+                            (flipRows, flipCols, False))
+
+
+def transform_cell(cell, symmetry, shape):
+    """
+    Changes coordinates of one cell the same way transform_matrix
+    changes matrix; shape is (rows, columns) of the matrix.
+    [-1, -1] (no cell) stays.
+    """
+    if list(cell) == [-1, -1]:
+        return [-1, -1]
+    flipRows, flipCols, transpose = symmetry
+    i, j = cell
+    if flipRows:
+        i = shape[0] - 1 - i
+    if flipCols:
+        j = shape[1] - 1 - j
+    return [int(j), int(i)] if transpose else [int(i), int(j)]
+
+
+def undo_cell(cell, symmetry, shape):
+    """
+    Reverts transform of coordinates of one cell; shape is
+    (rows, columns) of original picture. [-1, -1] stays.
+    """
+    if list(cell) == [-1, -1]:
+        return [-1, -1]
+    flipRows, flipCols, transpose = symmetry
+    i, j = (cell[1], cell[0]) if transpose else (cell[0], cell[1])
+    if flipRows:
+        i = shape[0] - 1 - i
+    if flipCols:
+        j = shape[1] - 1 - j
+    return [int(i), int(j)]
+
+
+def fingerprint(Rows, Columns):
+    """Returns fingerprint of clues exactly as they are given"""
+    clues = (tuple(tuple(row) for row in Rows),
+             tuple(tuple(col) for col in Columns))
+    return hashlib.sha1(repr(clues).encode()).hexdigest()
+
+
+def canonical(Rows, Columns):
+    """
+    Returns fingerprint of clues which is the same for the picture
+    mirrored or transposed in any way, together with symmetry which
+    changes given clues to the canonical ones.
+
+    >>> canonical([[2], [1]], [[1], [2]])[0] == \
+            canonical([[1], [2]], [[2], [1]])[0]
+    True
+    """
+    Rows = tuple(tuple(row) for row in Rows)
+    Columns = tuple(tuple(col) for col in Columns)
+    best = None
+    for symmetry in SYMMETRIES:
+        flipRows, flipCols, transpose = symmetry
+        rows, cols = Rows, Columns
+        if flipRows:
+            rows, cols = rows[::-1], tuple(col[::-1] for col in cols)
+        if flipCols:
+            rows, cols = tuple(row[::-1] for row in rows), cols[::-1]
+        clues = (cols, rows) if transpose else (rows, cols)
+        if best is None or clues < best[0]:
+            best = (clues, symmetry)
+    return fingerprint(*best[0]), best[1]
+
+
+class PuzzleIndex:
+    """
+    Hash index of nonograms. Nonograms are kept by their own
+    fingerprint, so mirrored or transposed nonogram is a different
+    one. Results of solving are kept by canonical fingerprint (in
+    canonical orientation, solutions as PackedGrid), so a nonogram,
+    its mirror images and its transposition share them - each is
+    solved only once.
+    """
+    def __init__(self):
+        self.puzzles = set()
+        self.entries = {}
+
+    def __contains__(self, clues):
+        return fingerprint(*clues) in self.puzzles
+
+    def __len__(self):
+        return len(self.puzzles)
+
+    def add(self, Rows, Columns):
+        """
+        Adds nonogram to the index. Returns False if exactly the
+        same one was already there.
+        """
+        key = fingerprint(Rows, Columns)
+        if key in self.puzzles:
+            return False
+        self.puzzles.add(key)
+        self.entries.setdefault(canonical(Rows, Columns)[0], {})
+        return True
+
+    def remember(self, Rows, Columns, status=None, solution=None,
+                 pair=None, hints=None):
+        """Keeps results of solving nonogram"""
+        key, symmetry = canonical(Rows, Columns)
+        entry = self.entries.setdefault(key, {})
+        if status is not None:
+            entry['status'] = status
+        if solution is not None:
+            entry['solution'] = PackedGrid(transform_matrix(solution,
+                                                            symmetry))
+        if pair is not None:
+            entry['pair'] = transform_cell(pair, symmetry,
+                                           (len(Rows), len(Columns)))
+        if hints is not None:
+            entry['hints'] = [transform_cell(hint[:2], symmetry,
+                                             (len(Rows), len(Columns))) +
+                              [int(hint[2])] for hint in hints]
+
+    def recall(self, Rows, Columns):
+        """
+        Returns remembered results (dict with 'status', 'solution',
+        'pair' and 'hints' - whichever are known) in orientation of given
+        clues, also when they were found for symmetric nonogram, or None
+        if neither is in the index.
+        """
+        key, symmetry = canonical(Rows, Columns)
+        if key not in self.entries:
+            return None
+        entry = self.entries[key]
+        result = {}
+        if 'status' in entry:
+            result['status'] = entry['status']
+        if 'solution' in entry:
+            result['solution'] = undo_matrix(entry['solution'].to_matrix(),
+                                             symmetry).tolist()
+        if 'pair' in entry:
+            result['pair'] = undo_cell(entry['pair'], symmetry,
+                                       (len(Rows), len(Columns)))
+        if 'hints' in entry:
+            result['hints'] = [undo_cell(hint[:2], symmetry,
+                                         (len(Rows), len(Columns))) +
+                               [hint[2]] for hint in entry['hints']]
+        return result
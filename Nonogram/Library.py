@@ -0,0 +1,89 @@
+from Nonogram.Solver import read_clues, clues_to_text
+from Nonogram.Index import fingerprint
+import tempfile
+import stat
+import os
+
+
+class Library:
+    """
+    File with nonograms (format of import_from_file) which is only
+    appended to: adding a nonogram writes just this nonogram and
+    waits until it is on the disk, so a crash can lose at most the
+    last one (broken last block is skipped while reading).
+    compact rewrites the whole file into a temporary one and swaps
+    them, so the file is always either old or new one.
+    """
+    def __init__(self, file):
+        self.file = file
+        self.size = os.path.getsize(file) if os.path.exists(file) else 0
+        self.found = None
+
+    @property
+    def keys(self):
+        """
+        Fingerprints (see Index.fingerprint) of nonograms in the
+        file, read when they are needed for the first time
+        """
+        if self.found is None:
+            self.found = set()
+            if os.path.exists(self.file):
+                for Rows, Columns in read_clues(self.file):
+                    self.found.add(fingerprint(Rows, Columns))
+        return self.found
+
+    def __contains__(self, clues):
+        return fingerprint(*clues) in self.keys
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, Rows, Columns):
+        """
+        Appends nonogram to the file. Returns False if it is already
+        there (mirrored or transposed nonogram is a different one).
+        """
+        key = fingerprint(Rows, Columns)
+        if key in self.keys:
+            return False
+        text = clues_to_text(Rows, Columns)
+        if self.size:
+            text = '\n\n' + text
+        with open(self.file, 'a') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+            self.size = f.tell()
+        self.keys.add(key)
+        return True
+
+    def compact(self, nonograms=None):
+        """
+        Rewrites file without broken blocks and repeated nonograms.
+        If list of (Rows, Columns) is given, file will contain
+        exactly these nonograms. Permissions of the file are kept.
+        """
+        if nonograms is None:
+            nonograms = read_clues(self.file) \
+                if os.path.exists(self.file) else []
+        keys, texts = set(), []
+        for Rows, Columns in nonograms:
+            key = fingerprint(Rows, Columns)
+            if key not in keys:
+                keys.add(key)
+                texts.append(clues_to_text(Rows, Columns))
+        directory = os.path.dirname(os.path.abspath(self.file))
+        handle, name = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'w') as f:
+                f.write('\n\n'.join(texts))
+                f.flush()
+                os.fsync(f.fileno())
+            if os.path.exists(self.file):
+                os.chmod(name, stat.S_IMODE(os.stat(self.file).st_mode))
+            os.replace(name, self.file)
+        except BaseException:
+            os.unlink(name)
+            raise
+        self.found = keys
+        self.size = os.path.getsize(self.file)
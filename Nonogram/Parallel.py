@@ -0,0 +1,87 @@
+from Nonogram.Solver import Row, ContradictionError, cell_value
+from multiprocessing import shared_memory
+import multiprocessing
+import numpy as np
+import os
+
+worker = {}
+
+
+def attach(name, shape, Rows, Columns):
+    """Connects worker process to the shared grid"""
+    worker['memory'] = shared_memory.SharedMemory(name=name)
+    worker['grid'] = np.ndarray(shape, dtype=np.int8,
+                                buffer=worker['memory'].buf)
+    worker['clues'] = {'row': Rows, 'column': Columns}
+    worker['lines'] = {}
+
+
+def solve_lines(task):
+    """
+    Solves given lines of one kind ('row' or 'column') and writes
+    their new cells to the shared grid. Lines of one kind don't
+    share cells, so workers never write the same cell.
+    Returns list of crossing lines which got new cells and number
+    of line which can't match its clues (or None).
+    """
+    kind, numbers = task
+    grid = worker['grid'] if kind == 'row' else worker['grid'].T
+    crossing = []
+    for number in numbers:
+        line = grid[number]
+        if (kind, number) not in worker['lines']:
+            worker['lines'][(kind, number)] = \
+                Row(len(line), worker['clues'][kind][number], 'dp')
+        Line = worker['lines'][(kind, number)]
+        for place, value in enumerate(line):
+            if value:
+                Line.cells[place] = {x for x in Line.cells[place]
+                                     if x * value > 0}
+        Line.solve()
+        for place, cell in enumerate(Line.cells):
+            if not cell:
+                return crossing, number
+            value = cell_value(cell)
+            if value != line[place]:
+                line[place] = value
+                crossing.append(place)
+    return crossing, None
+
+
+def parallel_solve(Rows, Columns, processes=None, chunks=None):
+    """
+    Line solving where all rows (and then all columns) are solved
+    at the same time by a pool of processes. Grid of known cells
+    (1 - filled, -1 - empty, 0 - unknown) lives in shared memory;
+    after every half-sweep pool waits for all workers before lines
+    of the other kind are solved. Only lines crossing new cells are
+    solved again. Returns the grid as numpy array.
+    Raises ContradictionError if clues can't be matched.
+    """
+    shape = (len(Rows), len(Columns))
+    memory = shared_memory.SharedMemory(create=True,
+                                        size=max(1, shape[0] * shape[1]))
+    try:
+        grid = np.ndarray(shape, dtype=np.int8, buffer=memory.buf)
+        grid[:] = 0
+        with multiprocessing.Pool(processes, attach,
+                                  (memory.name, shape, Rows,
+                                   Columns)) as pool:
+            size = chunks or processes or os.cpu_count()
+            dirty = {'row': set(range(shape[0])),
+                     'column': set(range(shape[1]))}
+            kind, other = 'row', 'column'
+            while dirty['row'] or dirty['column']:
+                numbers = sorted(dirty[kind])
+                dirty[kind] = set()
+                tasks = [(kind, numbers[n::size]) for n in range(size)
+                         if numbers[n::size]]
+                for crossing, wrong in pool.map(solve_lines, tasks):
+                    if wrong is not None:
+                        raise ContradictionError(kind, wrong)
+                    dirty[other].update(crossing)
+                kind, other = other, kind
+        return grid.copy()
+    finally:
+        memory.close()
+        memory.unlink()
@@ -0,0 +1,497 @@
+import heapq
+
+
+def line_clauses(clue, cells, new_var):
+    """
+    Returns clauses which say that cells (variables of one line,
+    in order) match clue. Line is read by automaton for pattern
+    0* 1^a 0+ 1^b ... 0*; new variable s[t][q] means automaton
+    is in state q after t cells. Only states which can be reached
+    from the start and still lead to the end are encoded.
+
+    >>> line_clauses([1], [1], iter(range(2, 10)).__next__)
+    [[2], [-2, 1], [-2, -1, 3], [-2, 1, -3], [-3, 2], [3]]
+    """
+    pattern = [0]
+    for block in clue:
+        if block:
+            pattern += [1] * block + [0]
+    accepting = {len(pattern) - 1}
+    if len(pattern) > 1:
+        accepting.add(len(pattern) - 2)
+
+    def step(q, a):
+        if pattern[q] == 0 and a == 0:
+            return q
+        if q + 1 < len(pattern) and pattern[q + 1] == a:
+            return q + 1
+        return None
+
+    reach = [{0}]
+    for _ in cells:
+        reach.append({step(q, a) for q in reach[-1] for a in (0, 1)} -
+                     {None})
+    alive = [reach[-1] & accepting]
+    for states in reversed(reach[:-1]):
+        alive.insert(0, {q for q in states
+                         if any(step(q, a) in alive[0] for a in (0, 1))})
+    if not alive[0]:
+        return [[]]
+    states = [{q: new_var() for q in sorted(x)} for x in alive]
+    clauses = [[states[0][0]]]
+    for t, cell in enumerate(cells):
+        before = {}
+        for q, s in states[t].items():
+            for a, x in ((0, -cell), (1, cell)):
+                following = states[t + 1].get(step(q, a))
+                if following is None:
+                    clauses.append([-s, -x])
+                else:
+                    clauses.append([-s, -x, following])
+                    clauses.append([-s, x, -following])
+                    before.setdefault(following, []).append(s)
+        for following, previous in before.items():
+            clauses.append([-following] + previous)
+        clauses.append(list(states[t + 1].values()))
+    return clauses
+
+
+def encode(Rows, Columns):
+    """
+    Encodes nonogram as CNF. Variable i * width + j + 1 is true
+    when cell (i, j) is filled, next ones are states of automatons
+    of lines. Returns (number of variables, list of clauses).
+    """
+    height, width = len(Rows), len(Columns)
+    variables = [height * width]
+
+    def new_var():
+        variables[0] += 1
+        return variables[0]
+
+    clauses = []
+    for i, clue in enumerate(Rows):
+        clauses += line_clauses(clue, [i * width + j + 1
+                                       for j in range(width)], new_var)
+    for j, clue in enumerate(Columns):
+        clauses += line_clauses(clue, [i * width + j + 1
+                                       for i in range(height)], new_var)
+    return variables[0], clauses
+
+
+def to_dimacs(Rows, Columns, file):
+    """Writes CNF of nonogram to file in DIMACS format"""
+    variables, clauses = encode(Rows, Columns)
+    with open(file, 'w') as f:
+        f.write('c nonogram %dx%d, variable i*%d+j+1 is cell (i, j)\n'
+                % (len(Rows), len(Columns), len(Columns)))
+        f.write('p cnf %d %d\n' % (variables, len(clauses)))
+        for clause in clauses:
+            f.write(' '.join(str(x) for x in clause) + ' 0\n')
+
+
+def luby(n):
+    """
+    n-th element (from 1) of Luby sequence 1 1 2 1 1 2 4 ...
+
+    >>> [luby(n) for n in range(1, 8)]
+    [1, 1, 2, 1, 1, 2, 4]
+    """
+    k = 1
+    while (1 << k) - 1 < n:
+        k += 1
+    while n != (1 << k) - 1:
+        n -= (1 << (k - 1)) - 1
+        k = 1
+        while (1 << k) - 1 < n:
+            k += 1
+    return 1 << (k - 1)
+
+
+class CDCL:
+    """
+    Small CDCL SAT solver: unit propagation with two watched
+    literals, learning of first UIP clauses with backjumping,
+    choosing most active variables (VSIDS) with saved phases and
+    Luby restarts. Literals are non-zero integers as in DIMACS
+    (-v is negation of variable v). Clauses can be added between
+    calls of solve, and solve can take assumptions.
+    Only decision variables are guessed; others must follow from
+    them (like states of automatons follow from cells), so model
+    is given only for them and for variables which follow.
+
+    >>> S = CDCL(2)
+    >>> S.add_clause([1, 2]), S.add_clause([-1, 2])
+    (True, True)
+    >>> S.solve(), S.model[2]
+    (True, 1)
+    >>> S.solve([-2])
+    False
+    """
+    def __init__(self, variables=0):
+        self.values = [0]
+        self.levels = [0]
+        self.reasons = [None]
+        self.activity = [0.0]
+        self.phases = [-1]
+        self.decision = [False]
+        self.watches = {}
+        self.clauses = []
+        self.trail = []
+        self.limits = []
+        self.head = 0
+        self.heap = []
+        self.increment = 1.0
+        self.ok = True
+        self.model = None
+        self.conflicts = 0
+        for _ in range(variables):
+            self.new_var()
+
+    def new_var(self, decision=True):
+        """Adds variable and returns its number"""
+        v = len(self.values)
+        self.values.append(0)
+        self.levels.append(0)
+        self.reasons.append(None)
+        self.activity.append(0.0)
+        self.phases.append(-1)
+        self.decision.append(decision)
+        self.watches[v] = []
+        self.watches[-v] = []
+        if decision:
+            heapq.heappush(self.heap, (0.0, v))
+        return v
+
+    def value(self, lit):
+        """1 if literal is true, -1 if false, 0 if not assigned"""
+        value = self.values[abs(lit)]
+        return value if lit > 0 else -value
+
+    def assign(self, lit, reason):
+        v = abs(lit)
+        self.values[v] = 1 if lit > 0 else -1
+        self.levels[v] = len(self.limits)
+        self.reasons[v] = reason
+        self.trail.append(lit)
+
+    def attach(self, clause):
+        """Adds clause (at least 2 literals) watching its 2 first ones"""
+        self.clauses.append(clause)
+        self.watches[clause[0]].append(len(self.clauses) - 1)
+        self.watches[clause[1]].append(len(self.clauses) - 1)
+        return len(self.clauses) - 1
+
+    def add_clause(self, clause):
+        """
+        Adds clause (list of literals). Returns False when
+        clauses can't be satisfied any more.
+        """
+        self.cancel(0)
+        if not self.ok:
+            return False
+        lits = []
+        for lit in clause:
+            value = self.value(lit)
+            if value == 1 or -lit in lits:
+                return True
+            if value == 0 and lit not in lits:
+                lits.append(lit)
+        if not lits:
+            self.ok = False
+        elif len(lits) == 1:
+            self.assign(lits[0], None)
+            self.ok = self.propagate() is None
+        else:
+            self.attach(lits)
+        return self.ok
+
+    def propagate(self):
+        """
+        Assigns literals implied by clauses with only one literal
+        which is not false. Returns index of clause with all
+        literals false (conflict) or None.
+        """
+        values, clauses, watches = self.values, self.clauses, self.watches
+        while self.head < len(self.trail):
+            false = -self.trail[self.head]
+            self.head += 1
+            watching = watches[false]
+            kept = []
+            n = 0
+            while n < len(watching):
+                index = watching[n]
+                n += 1
+                clause = clauses[index]
+                if clause[0] == false:
+                    clause[0], clause[1] = clause[1], false
+                first = clause[0]
+                value = values[first] if first > 0 else -values[-first]
+                if value == 1:
+                    kept.append(index)
+                    continue
+                for k in range(2, len(clause)):
+                    lit = clause[k]
+                    if (values[lit] if lit > 0 else -values[-lit]) != -1:
+                        clause[1], clause[k] = lit, false
+                        watches[lit].append(index)
+                        break
+                else:
+                    kept.append(index)
+                    if value == -1:
+                        watches[false] = kept + watching[n:]
+                        return index
+                    self.assign(first, index)
+            watches[false] = kept
+        return None
+
+    def bump(self, v):
+        self.activity[v] += self.increment
+        if self.activity[v] > 1e100:
+            self.activity = [x * 1e-100 for x in self.activity]
+            self.increment *= 1e-100
+            self.heap = [(-self.activity[x], x)
+                         for x in range(1, len(self.values))
+                         if self.decision[x] and not self.values[x]]
+            heapq.heapify(self.heap)
+        elif self.decision[v] and not self.values[v]:
+            heapq.heappush(self.heap, (-self.activity[v], v))
+
+    def analyse(self, conflict):
+        """
+        Finds first UIP clause from conflict. Returns (learnt
+        clause, level to jump back to); first literal of clause
+        becomes true after the jump.
+        """
+        level = len(self.limits)
+        learnt = [None]
+        seen = set()
+        counter = 0
+        lit = None
+        pointer = len(self.trail) - 1
+        clause = self.clauses[conflict]
+        while True:
+            for q in (clause if lit is None else clause[1:]):
+                v = abs(q)
+                if v not in seen and self.levels[v] > 0:
+                    seen.add(v)
+                    self.bump(v)
+                    if self.levels[v] == level:
+                        counter += 1
+                    else:
+                        learnt.append(q)
+            while abs(self.trail[pointer]) not in seen:
+                pointer -= 1
+            lit = self.trail[pointer]
+            pointer -= 1
+            counter -= 1
+            if counter == 0:
+                break
+            clause = self.clauses[self.reasons[abs(lit)]]
+        learnt[0] = -lit
+        if len(learnt) == 1:
+            return learnt, 0
+        k = max(range(1, len(learnt)),
+                key=lambda x: self.levels[abs(learnt[x])])
+        learnt[1], learnt[k] = learnt[k], learnt[1]
+        return learnt, self.levels[abs(learnt[1])]
+
+    def cancel(self, level):
+        """Undoes assignments above given decision level"""
+        if len(self.limits) <= level:
+            return
+        for lit in self.trail[self.limits[level]:]:
+            v = abs(lit)
+            self.phases[v] = self.values[v]
+            self.values[v] = 0
+            self.reasons[v] = None
+            if self.decision[v]:
+                heapq.heappush(self.heap, (-self.activity[v], v))
+        del self.trail[self.limits[level]:]
+        del self.limits[level:]
+        self.head = len(self.trail)
+
+    def pick(self):
+        """Returns literal of most active free decision variable or None"""
+        while self.heap:
+            v = heapq.heappop(self.heap)[1]
+            if not self.values[v]:
+                return v if self.phases[v] > 0 else -v
+        return None
+
+    def solve(self, assumptions=(), conflicts=None):
+        """
+        Returns True when clauses (with assumptions - literals which
+        must be true) can be satisfied - then self.model[v] is 1 or -1
+        for every decision variable v - and False when they can't.
+        Returns None
+        when more than given number of conflicts were found.
+        """
+        self.cancel(0)
+        if not self.ok or self.propagate() is not None:
+            self.ok = False
+            return False
+        found = 0
+        restarts = 1
+        limit = 100 * luby(restarts)
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                self.conflicts += 1
+                found += 1
+                if not self.limits:
+                    self.ok = False
+                    return False
+                learnt, level = self.analyse(conflict)
+                self.cancel(level)
+                if len(learnt) == 1:
+                    self.assign(learnt[0], None)
+                else:
+                    self.assign(learnt[0], self.attach(learnt))
+                self.increment /= 0.95
+                continue
+            if conflicts is not None and found >= conflicts:
+                self.cancel(0)
+                return None
+            if found >= limit:
+                self.cancel(0)
+                restarts += 1
+                limit = found + 100 * luby(restarts)
+            level = len(self.limits)
+            if level < len(assumptions):
+                lit = assumptions[level]
+                if self.value(lit) == -1:
+                    self.cancel(0)
+                    return False
+                self.limits.append(len(self.trail))
+                if not self.value(lit):
+                    self.assign(lit, None)
+                continue
+            lit = self.pick()
+            if lit is None:
+                self.model = list(self.values)
+                self.cancel(0)
+                return True
+            self.limits.append(len(self.trail))
+            self.assign(lit, None)
+
+
+class SatNonogram:
+    """
+    Solves nonogram with CDCL on its CNF encoding, so it finds
+    solutions also for nonograms which can't be solved line by
+    line ('hard' ones). Cells of player's board (matrix with 1 for
+    filled, -1 for empty and 0 for unknown cell) are passed to the
+    solver as assumptions, so one solver (with clauses it learnt)
+    is used for every question about the nonogram.
+
+    >>> S = SatNonogram([[1], [1]], [[1], [1]])
+    >>> S.solve([[1, 0], [0, 0]])
+    [[1, -1], [-1, 1]]
+    >>> S.other([[1, -1], [-1, 1]])
+    [[-1, 1], [1, -1]]
+    >>> S.forced([[1, 0], [0, 0]])
+    (0, 1, -1)
+    """
+    def __init__(self, Rows, Columns):
+        self.height = len(Rows)
+        self.width = len(Columns)
+        variables, clauses = encode(Rows, Columns)
+        self.solver = CDCL(self.height * self.width)
+        for _ in range(variables - self.height * self.width):
+            self.solver.new_var(False)
+        for clause in clauses:
+            self.solver.add_clause(clause)
+
+    def literals(self, matrix):
+        """Assumptions for known cells of matrix"""
+        if matrix is None:
+            return []
+        return [(i * self.width + j + 1) * (1 if value > 0 else -1)
+                for i, row in enumerate(matrix)
+                for j, value in enumerate(row) if value]
+
+    def picture(self):
+        """Solution found by last call of solver"""
+        return [[self.solver.model[i * self.width + j + 1]
+                 for j in range(self.width)] for i in range(self.height)]
+
+    def solve(self, matrix=None, conflicts=None):
+        """
+        Returns solution (1 - filled, -1 - empty) which matches
+        known cells of matrix, or None if there is no such one
+        (or it wasn't found within given number of conflicts).
+        """
+        if self.solver.solve(self.literals(matrix), conflicts):
+            return self.picture()
+        return None
+
+    def other(self, solution, matrix=None, conflicts=None):
+        """
+        Returns solution different from given one (which matches
+        matrix, if it is given) or None if given one is the only one.
+        Different is forced by a blocking clause which is switched
+        on by a new variable only for this call.
+        """
+        guard = self.solver.new_var(False)
+        self.solver.add_clause([-guard] + [-x for x in
+                                           self.literals(solution)])
+        found = self.solver.solve(self.literals(matrix) + [guard],
+                                  conflicts)
+        self.solver.add_clause([-guard])
+        return self.picture() if found else None
+
+    def unique(self, conflicts=None):
+        """True if nonogram has exactly one solution"""
+        solution = self.solve(conflicts=conflicts)
+        return solution is not None and \
+            self.other(solution, conflicts=conflicts) is None
+
+    def forced(self, matrix):
+        """
+        Returns (row, column, value) of unknown cell of matrix which
+        has the same value in every solution matching matrix, or None
+        if there is no such cell. Raises ValueError when no solution
+        matches matrix.
+        """
+        solution = self.solve(matrix)
+        if solution is None:
+            raise ValueError('board does not match clues')
+        assumptions = self.literals(matrix)
+        unknown = [(i, j) for i, row in enumerate(matrix)
+                   for j, value in enumerate(row) if not value]
+        for i, j in unknown:
+            value = solution[i][j]
+            if value == 0:
+                continue
+            cell = (i * self.width + j + 1) * value
+            if not self.solver.solve(assumptions + [-cell]):
+                return i, j, value
+            other = self.picture()
+            for k, l in unknown:
+                if other[k][l] != solution[k][l]:
+                    solution[k][l] = 0
+        return None
+
+
+if __name__ == '__main__':
+    import argparse
+    from Nonogram.Solver import read_clues
+    parser = argparse.ArgumentParser(description='Solves nonograms from '
+                                     'file with SAT solver')
+    parser.add_argument('file')
+    parser.add_argument('--dimacs', default=None,
+                        help='writes CNF of n-th nonogram to DIMACS-n.cnf')
+    args = parser.parse_args()
+    for n, (Rows, Columns) in enumerate(read_clues(args.file)):
+        if args.dimacs is not None:
+            to_dimacs(Rows, Columns, '%s-%d.cnf' % (args.dimacs, n))
+            continue
+        S = SatNonogram(Rows, Columns)
+        solution = S.solve()
+        if solution is None:
+            print(n, 'no solution')
+        else:
+            print(n, 'unique' if S.other(solution) is None else 'nonunique')
+            print('\n'.join(''.join('#' if x > 0 else '.' for x in row)
+                            for row in solution))
@@ -0,0 +1,234 @@
+from Nonogram.Solver import nonogram, analyse_clues
+from Nonogram.SAT import SatNonogram
+from Nonogram.Grid import PackedGrid
+from Nonogram.Index import canonical, transform_clues, undo_matrix, \
+    undo_cell
+from concurrent.futures import ProcessPoolExecutor
+from collections import OrderedDict
+import asyncio
+import logging
+import json
+import time
+
+log = logging.getLogger(__name__)
+WORK_PER_SECOND = 2000
+CONFLICTS_PER_SECOND = 200
+
+
+def valid_clues(Rows, Columns):
+    """
+    Checks whether clues are lists of lists of non-negative
+    integers, with the same number of filled cells in rows and
+    columns, and every line fits in the nonogram.
+    """
+    for clues in (Rows, Columns):
+        if not isinstance(clues, list) or not clues:
+            return False
+        for line in clues:
+            if not isinstance(line, list) or not line or \
+               not all(type(x) is int and x >= 0 for x in line):
+                return False
+    if sum(map(sum, Rows)) != sum(map(sum, Columns)):
+        return False
+    return all(sum(line) + len(line) - 1 <= size
+               for clues, size in ((Rows, len(Columns)),
+                                   (Columns, len(Rows)))
+               for line in clues)
+
+
+def analyse(Rows, Columns, deadline=60, work=None, conflicts=None):
+    """
+    Classifies nonogram the same way as import_from_file
+    ('unique', 'nonunique' or 'hard') and solves it within about
+    deadline seconds. Analysis gets work budget of line solves
+    (see analyse_clues; by default half of the deadline); when it
+    runs out nonogram is hard. Hard ones are solved with SAT
+    solver, given as many conflicts as fit in the rest of the
+    deadline. Runs in worker process; solution is sent back as
+    PackedGrid, and 'limited' tells whether the answer was cut
+    short by the deadline (such answers are not cached).
+    """
+    start = time.monotonic()
+    if work is None:
+        work = int(deadline * WORK_PER_SECOND / 2)
+    status, pair, solution, hints = analyse_clues(Rows, Columns, work)
+    limited = solution is None
+    if limited:
+        NG = nonogram(Rows, Columns)
+        NG.solve(budget=work)
+        solution = NG.nonogram_Matrix
+    if status == 'hard':
+        if conflicts is None:
+            conflicts = int((deadline - time.monotonic() + start) *
+                            CONFLICTS_PER_SECOND)
+        found = None
+        if conflicts > 0:
+            found = SatNonogram(Rows, Columns).solve(conflicts=conflicts)
+        limited = limited and found is None
+        solution = found or solution
+    return {'status': status, 'pair': [int(x) for x in pair],
+            'hints': [[int(x) for x in hint] for hint in hints],
+            'solution': PackedGrid(solution), 'limited': limited}
+
+
+class SolverServer:
+    """
+    Small HTTP server which solves and classifies nonograms
+    for other tools. Clues are sent as JSON:
+
+        POST /solve  {"rows": [[1], [1]], "columns": [[1], [1]]}
+
+    and answer contains 'status', 'pair', 'hints' and 'solution'.
+    Solving runs in a process pool; each request has a deadline
+    which also bounds the work done for it in the pool,
+    at most max_pending requests are solved at once (others get
+    503) and results are cached by fingerprint of clues, so
+    mirrored or transposed nonogram is taken from the cache too.
+    By default it listens only on localhost.
+    """
+    def __init__(self, host='127.0.0.1', port=8080, workers=None,
+                 deadline=60, max_pending=32, cache_size=1024):
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.deadline = deadline
+        self.max_pending = max_pending
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.running = {}
+        self.pending = 0
+        self.pool = None
+        self.server = None
+
+    async def start(self):
+        """Starts pool and server. With port 0 free port is chosen"""
+        self.pool = ProcessPoolExecutor(self.workers)
+        self.server = await asyncio.start_server(self.handle, self.host,
+                                                 self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        """Stops server and worker processes"""
+        self.server.close()
+        await self.server.wait_closed()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    async def solve(self, Rows, Columns, deadline=None):
+        """
+        Returns (HTTP status, answer) for given clues, taking
+        it from cache or from already running request if possible.
+        """
+        key, symmetry = canonical(Rows, Columns)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            return 200, self.orient(self.cache[key], symmetry,
+                                    (len(Rows), len(Columns)), True)
+        if deadline is None:
+            deadline = self.deadline
+        if key not in self.running:
+            if self.pending >= self.max_pending:
+                return 503, {'error': 'too many requests'}
+            loop = asyncio.get_running_loop()
+            self.running[key] = loop.run_in_executor(
+                self.pool, analyse, *transform_clues(Rows, Columns, symmetry),
+                deadline)
+            self.pending += 1
+            self.running[key].add_done_callback(
+                lambda future: self.finished(key, future))
+        try:
+            result = await asyncio.wait_for(
+                asyncio.shield(self.running[key]), deadline)
+        except asyncio.TimeoutError:
+            return 504, {'error': 'deadline exceeded'}
+        return 200, self.orient(result, symmetry, (len(Rows), len(Columns)),
+                                False)
+
+    @staticmethod
+    def orient(result, symmetry, shape, cached):
+        """
+        Results are solved for canonical clues; this turns them
+        back to the orientation of the request.
+        """
+        return {'status': result['status'],
+                'pair': undo_cell(result['pair'], symmetry, shape),
+                'hints': [undo_cell(hint[:2], symmetry, shape) + [hint[2]]
+                          for hint in result['hints']],
+                'solution': undo_matrix(result['solution'].to_matrix(),
+                                        symmetry).tolist(),
+                'cached': cached}
+
+    def finished(self, key, future):
+        """Moves result of finished request to the cache"""
+        self.pending -= 1
+        del self.running[key]
+        if future.cancelled() or future.exception() is not None or \
+           future.result()['limited']:
+            return
+        self.cache[key] = future.result()
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    async def handle(self, reader, writer):
+        """Reads one HTTP request and writes JSON answer"""
+        try:
+            status, answer = await self.respond(reader)
+        except (ValueError, TypeError, asyncio.IncompleteReadError):
+            status, answer = 400, {'error': 'bad request'}
+        except Exception:
+            log.exception('request failed')
+            status, answer = 500, {'error': 'internal error'}
+        body = json.dumps(answer).encode()
+        reasons = {200: 'OK', 400: 'Bad Request', 404: 'Not Found',
+                   500: 'Internal Server Error', 503: 'Service Unavailable',
+                   504: 'Gateway Timeout'}
+        writer.write(('HTTP/1.1 %d %s\r\nContent-Type: application/json\r\n'
+                      'Content-Length: %d\r\nConnection: close\r\n\r\n'
+                      % (status, reasons[status], len(body))).encode() + body)
+        await writer.drain()
+        writer.close()
+
+    async def respond(self, reader):
+        """Parses request and returns (HTTP status, answer)"""
+        method, path, _ = (await reader.readline()).decode().split(' ', 2)
+        length = 0
+        while True:
+            line = (await reader.readline()).decode().strip()
+            if not line:
+                break
+            name, value = line.split(':', 1)
+            if name.strip().lower() == 'content-length':
+                length = int(value)
+        if method == 'GET' and path == '/stats':
+            return 200, {'cached': len(self.cache), 'pending': self.pending}
+        if method != 'POST' or path != '/solve':
+            return 404, {'error': 'not found'}
+        request = json.loads((await reader.readexactly(length)).decode())
+        if not isinstance(request, dict):
+            raise ValueError('request is not an object')
+        deadline = request.get('deadline')
+        if deadline is not None:
+            deadline = float(deadline)
+        Rows, Columns = request.get('rows'), request.get('columns')
+        if not valid_clues(Rows, Columns):
+            return 400, {'error': 'wrong clues'}
+        return await self.solve(Rows, Columns, deadline)
+
+
+async def serve(host='127.0.0.1', port=8080, **options):
+    """Runs solving server until it is interrupted"""
+    server = SolverServer(host, port, **options)
+    await server.start()
+    try:
+        await server.server.serve_forever()
+    finally:
+        await server.close()
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Nonogram solving server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port, workers=args.workers))
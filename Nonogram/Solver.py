@@ -1,9 +1,47 @@
 from Nonogram.timeout import timeout
-from collections import defaultdict
+from Nonogram.Index import PuzzleIndex
+from Nonogram.Grid import PackedGrid
+from collections import defaultdict, deque, namedtuple
 from ast import literal_eval
 from PIL import Image
 import numpy as np
+import multiprocessing
 import itertools
+import json
+import os
+
+try:
+    LANCZOS = Image.Resampling.LANCZOS
+except AttributeError:
+    LANCZOS = Image.LANCZOS
+
+
+CONVERGED = 'converged'
+CONTRADICTION = 'contradiction'
+BUDGET = 'budget'
+RATING_WORK = 1000
+ANALYSIS_WORK = 20000
+
+
+class ContradictionError(ValueError):
+    """
+    Raised when some line cannot match its clues
+    with cells that are already filled or emptied.
+    """
+    def __init__(self, kind, number):
+        ValueError.__init__(self, 'contradiction in %s %d' % (kind, number))
+        self.kind = kind
+        self.number = number
+
+
+class BudgetError(Exception):
+    """
+    Raised when limit of work (see nonogram.limit) of nonogram
+    and its copies is used up.
+    """
+
+
+Step = namedtuple('Step', 'line cells reason wave')
 
 
 def cell_naming(clues):
@@ -111,15 +149,19 @@ def immediate_successors(naming):
 class Row:
     """Representation of the row."""
 
-    def __init__(self, width, clues):
+    def __init__(self, width, clues, engine='sets'):
         """
         Generate one row (or column).
 
         A row consists of cells. Here, cells are sets of possible values.
+        engine chooses how the row is solved: 'sets' - passes of
+        solver_pass until nothing changes, 'dp' - line_solve.
 
         >>> Row(3, [1, 1]).details_str()
         '[{-5,-3,-1,2,4},{-5,-3,-1,2,4},{-5,-3,-1,2,4}]'
         """
+        self.clues = [clue for clue in clues if clue]
+        self.engine = engine
         naming = list(cell_naming(clues))
         naming_s = set(naming)
 
@@ -138,6 +180,37 @@ class Row:
                               ','.join(str(x) for x in sorted(cell)) + '}'
                               for cell in self.cells) + ']'
 
+    def copy(self):
+        """Returns copy of the row with its own cells"""
+        row = Row.__new__(Row)
+        row.__dict__.update(self.__dict__)
+        row.cells = [cell.copy() for cell in self.cells]
+        return row
+
+    def solve(self):
+        """
+        Removes values which can't be in cells
+        with any placement of groups matching clues.
+        """
+        if self.engine == 'dp':
+            line = [cell_value(cell) for cell in self.cells]
+            if not all(self.cells):
+                return
+            solved = line_solve(self.clues, line)
+            if solved is None:
+                self.cells = [set() for _ in self.cells]
+                return
+            for place, value in enumerate(solved):
+                if value != line[place]:
+                    self.cells[place] = {x for x in self.cells[place]
+                                         if x * value > 0}
+            return
+        before = ""
+        while before != self.details_str():
+            before = self.details_str()
+            self.forward_solver()
+            self.backward_solver()
+
     def forward_solver(self):
         solver_pass(self)
 
@@ -187,6 +260,108 @@ def solver_pass(row):
         predecessor_cell = current_cell
 
 
+def line_solve(clues, line):
+    """
+    Exact line solver. Line is a list with 1 (filled), -1 (empty)
+    and 0 (unknown) cells. Returns line where unknown cells which
+    are filled (or empty) in every placement of groups matching
+    clues and known cells are filled (emptied), or None if there
+    is no such placement. Works in O(length * number of groups):
+
+     - before[j][i] - first j groups fit in first i cells,
+     - after[j][i] - groups from j-th on fit in cells from i-th on,
+
+    cell can be empty if j groups fit before it and the rest after
+    it; group j can start at s if before[j][s - 1] and
+    after[j + 1][s + size + 1] and there is no empty cell under it.
+
+    >>> line_solve([3], [0, 0, 0, 0])
+    [0, 1, 1, 0]
+    >>> line_solve([1, 1], [0, 0, 0])
+    [1, -1, 1]
+    >>> line_solve([2], [0, 1, 0, 0, 1])
+    """
+    clues = [clue for clue in clues if clue]
+    n, k = len(line), len(clues)
+    empties = [0]
+    fills = [0]
+    for value in line:
+        empties.append(empties[-1] + (value == -1))
+        fills.append(fills[-1] + (value == 1))
+
+    def fits(start, size):
+        """Group can lie on cells start..start+size-1"""
+        return empties[start + size] == empties[start]
+
+    before = [[False] * (n + 1) for _ in range(k + 1)]
+    for i in range(n + 1):
+        before[0][i] = fills[i] == 0
+    for j in range(1, k + 1):
+        size = clues[j - 1]
+        for i in range(1, n + 1):
+            if before[j][i - 1] and line[i - 1] != 1:
+                before[j][i] = True
+            elif i >= size and fits(i - size, size):
+                start = i - size
+                if j == 1:
+                    before[j][i] = before[0][start]
+                else:
+                    before[j][i] = start > 0 and line[start - 1] != 1 \
+                        and before[j - 1][start - 1]
+    after = [[False] * (n + 1) for _ in range(k + 2)]
+    for i in range(n + 1):
+        after[k + 1][i] = fills[n] - fills[i] == 0
+    for j in range(k, 0, -1):
+        size = clues[j - 1]
+        for i in range(n - 1, -1, -1):
+            if after[j][i + 1] and line[i] != 1:
+                after[j][i] = True
+            elif i + size <= n and fits(i, size):
+                end = i + size
+                if j == k:
+                    after[j][i] = after[k + 1][end]
+                else:
+                    after[j][i] = end < n and line[end] != 1 \
+                        and after[j + 1][end + 1]
+    if not before[k][n]:
+        return None
+    canEmpty = [False] * n
+    for i in range(n):
+        if line[i] != 1:
+            canEmpty[i] = any(before[j][i] and after[j + 1][i + 1]
+                              for j in range(k + 1))
+    covered = [0] * (n + 1)
+    for j in range(1, k + 1):
+        size = clues[j - 1]
+        for start in range(n - size + 1):
+            end = start + size
+            if not fits(start, size):
+                continue
+            if j == 1:
+                left = before[0][start]
+            else:
+                left = start > 0 and line[start - 1] != 1 and \
+                    before[j - 1][start - 1]
+            if j == k:
+                right = after[k + 1][end]
+            else:
+                right = end < n and line[end] != 1 and after[j + 1][end + 1]
+            if left and right:
+                covered[start] += 1
+                covered[end] -= 1
+    solved = []
+    running = 0
+    for i in range(n):
+        running += covered[i]
+        if running and not canEmpty[i]:
+            solved.append(1)
+        elif canEmpty[i] and not running:
+            solved.append(-1)
+        else:
+            solved.append(0 if running else line[i])
+    return solved
+
+
 def isCellFilled(cell):
     return all(x > 0 for x in cell)
 
@@ -195,6 +370,16 @@ def isCellBlank(cell):
     return all(x < 0 for x in cell)
 
 
+def cell_value(cell):
+    """
+    Returns 1 for filled cell, -1 for blank one and 0 when
+    it is not known yet (or cell has no possible values).
+    """
+    if not cell:
+        return 0
+    return 1 * isCellFilled(cell) - 1 * isCellBlank(cell)
+
+
 def cell_to_str(cell):
     if isCellFilled(cell):
         return '#'
@@ -227,11 +412,12 @@ class nonogram:
     M - height
     Represents one nonogram picture
     """
-    def __init__(self, Rows, Columns):
+    def __init__(self, Rows, Columns, engine='dp'):
         """
         Generates nonogram. As input it takes:
         -list of lists with clues for rows
         -list of lists with clues for columns
+        -engine of line solver for rows and columns (see Row)
         """
         N = len(Columns)
         M = len(Rows)
@@ -245,13 +431,69 @@ class nonogram:
             N = 4
             M = 4
         self.pair = [-1, -1]
+        self.hints = []
         self.width = N
         self.height = M
         self.Rows = Rows
         self.Columns = Columns
-        self.iterRows = [Row(self.width, r) for r in self.Rows]
-        self.iterCols = [Row(self.height, c) for c in self.Columns]
-        self.nonogram_Matrix = np.zeros((N, M))
+        self.engine = engine
+        self.iterRows = [Row(self.width, r, engine) for r in self.Rows]
+        self.iterCols = [Row(self.height, c, engine) for c in self.Columns]
+        self.nonogram_Matrix = [[0] * N for _ in range(M)]
+        self.verifier = None
+        self.rounds = 0
+        self.lineSolves = 0
+        self.queue = deque()
+        self.queued = set()
+        self.status = None
+        self.analysis = None
+        self.work = None
+
+    def copy(self):
+        """
+        Returns copy of nonogram with the same state of solving,
+        which can be changed without changing this one.
+        """
+        self.spend(self.height + self.width)
+        NG = nonogram.__new__(nonogram)
+        NG.__dict__.update(self.__dict__)
+        NG.iterRows = [row.copy() for row in self.iterRows]
+        NG.iterCols = [col.copy() for col in self.iterCols]
+        NG.queue = deque(self.queue)
+        NG.queued = set(self.queued)
+        return NG
+
+    def limit(self, lines):
+        """
+        Limits work of solving to given number of lines which are
+        solved or copied (copy of nonogram costs all its lines).
+        Copies share the limit with this nonogram, so it bounds
+        searches and probing too. When it is used up, BudgetError
+        is raised. None - no limit.
+        """
+        self.work = None if lines is None else [lines]
+
+    def spend(self, lines):
+        """Takes lines from the limit of work (see limit)"""
+        if self.work is not None:
+            self.work[0] -= lines
+            if self.work[0] < 0:
+                raise BudgetError('work limit used up')
+
+    def to_matrix(self):
+        """
+        Returns current state as list of lists with 1 for filled,
+        -1 for empty and 0 for not yet known cell
+        """
+        return [[cell_value(cell) for cell in Row.cells]
+                for Row in self.iterRows]
+
+    def grid(self):
+        """
+        Returns copy of current state as PackedGrid (2 bits per cell)
+        for storing or sending; the solver itself keeps lists.
+        """
+        return PackedGrid(self.to_matrix())
 
     def checkifcorrect(self, N, M, Rows, Columns):
         """
@@ -284,11 +526,7 @@ class nonogram:
             print(self.iterRows[i])
 
     def one_step(self, Row):
-        Row2 = ""
-        while Row2 != Row.details_str():
-            Row2 = Row.details_str()
-            Row.forward_solver()
-            Row.backward_solver()
+        Row.solve()
 
     def multi_step(self):
         for Row in self.iterRows:
@@ -322,59 +560,350 @@ class nonogram:
                     self.iterRows[erow].cells[ecol] = {x for x in cell2
                                                        if x < 0}
 
-    def solve(self):
+    def set_cell(self, RowNumber, ColNumber, value):
+        """
+        Forces cell to become filled (value 1) or empty (value -1)
+        both in its row and in its column.
+        """
+        for kind, line, place in (('row', RowNumber, ColNumber),
+                                  ('column', ColNumber, RowNumber)):
+            Line = self.iterRows[line] if kind == 'row' \
+                else self.iterCols[line]
+            cell = {x for x in Line.cells[place] if x * value > 0}
+            if not cell:
+                raise ContradictionError(kind, line)
+            Line.cells[place] = cell
+
+    def solve_line(self, kind, number):
+        """
+        Solves one row or column and passes its new filled
+        or emptied cells to crossing lines.
+        Returns list of new cells as (row, column, value).
+        """
+        Line, Crossing = (self.iterRows[number], self.iterCols) \
+            if kind == 'row' else (self.iterCols[number], self.iterRows)
+        self.one_step(Line)
+        found = []
+        for place, cell in enumerate(Line.cells):
+            if not cell:
+                raise ContradictionError(kind, number)
+            value = cell_value(cell)
+            if value and cell_value(Crossing[place].cells[number]) != value:
+                i, j = (number, place) if kind == 'row' else (place, number)
+                self.set_cell(i, j, value)
+                found.append((i, j, value))
+        return found
+
+    @property
+    def pending(self):
+        """Lines which are waiting in the queue to be solved"""
+        return [line for line, _ in self.queue]
+
+    def push(self, line, wave=1):
+        """Adds line ('row', number) or ('column', number) to the queue"""
+        if line not in self.queued:
+            self.queued.add(line)
+            self.queue.append((line, wave))
+
+    def push_all(self):
+        """Adds every row and then every column to the queue"""
+        for i in range(self.height):
+            self.push(('row', i))
+        for j in range(self.width):
+            self.push(('column', j))
+
+    def solve_steps(self, lines=None, budget=None):
+        """
+        Adds lines to the queue (by default all rows and columns,
+        if the queue is empty) and returns generator which solves
+        lines from the queue. After every line which gave new cells
+        it yields Step(line, cells, reason, wave), where cells are
+        (row, column, value) and reason is 'clues' when the line had
+        no known cells before (cells follow from its clues alone) or
+        'crossing' when they follow from clues and cells found in
+        crossing lines. wave is the round of the queue (lines added
+        by lines from previous wave). Crossing lines of new cells are
+        added to the queue before the step is yielded, so the caller
+        can stop taking steps at any moment - lines which are left
+        stay in the queue and next call continues from them.
+        Generator stops when queue is empty or after budget line
+        solves. It raises ContradictionError (and empties the queue)
+        if clues can't be matched.
+
+        >>> NG = nonogram([[2], [1]], [[1], [2]])
+        >>> steps = NG.solve_steps()
+        >>> next(steps)
+        Step(line=('row', 0), cells=[(0, 0, 1), (0, 1, 1)], \
+reason='clues', wave=1)
+        >>> NG.pending
+        [('row', 1), ('column', 0), ('column', 1)]
+        """
+        if lines is None and not self.queue:
+            self.push_all()
+        for line in lines or []:
+            self.push(line)
+        return self.steps(budget)
+
+    def steps(self, budget=None):
+        """Generator of solve_steps"""
+        queue, queued = self.queue, self.queued
+        while queue:
+            if budget is not None:
+                if budget <= 0:
+                    return
+                budget -= 1
+            self.spend(1)
+            line, wave = queue.popleft()
+            queued.discard(line)
+            self.lineSolves += 1
+            self.rounds = max(self.rounds, wave)
+            Line = self.iterRows[line[1]] if line[0] == 'row' \
+                else self.iterCols[line[1]]
+            known = any(cell_value(cell) for cell in Line.cells)
+            try:
+                cells = self.solve_line(*line)
+            except ContradictionError:
+                queue.clear()
+                queued.clear()
+                raise
+            for i, j, value in cells:
+                self.push(('column', j) if line[0] == 'row' else ('row', i),
+                          wave + 1)
+            if cells:
+                yield Step(line, cells, 'crossing' if known else 'clues',
+                           wave)
+
+    def propagate(self, lines=None, budget=None):
+        """
+        Solves lines with solve_steps until the queue is empty or
+        budget line solves were done - then lines which are left
+        are kept in self.pending. Number of waves of the queue is
+        kept in self.rounds.
+        Returns list of new cells as (row, column, value).
+        Raises ContradictionError if clues can't be matched.
+        """
+        found = []
+        for step in self.solve_steps(lines, budget):
+            found += step.cells
+        return found
+
+    def seed(self, matrix):
+        """
+        Continues solving from partially known picture - matrix with
+        1 for filled, -1 for empty and 0 for unknown cell (e.g. board
+        of player or saved state). Only lines with new cells are
+        propagated. Returns list of cells deduced from them as
+        (row, column, value).
+        Raises ContradictionError if matrix doesn't match clues.
+        """
+        matrix = np.asarray(matrix)
+        lines = []
+        for i, j in zip(*np.nonzero(matrix)):
+            value = 1 if matrix[i][j] > 0 else -1
+            if cell_value(self.iterRows[i].cells[j]) == value:
+                continue
+            self.set_cell(i, j, value)
+            for line in (('row', i), ('column', j)):
+                if line not in lines:
+                    lines.append(line)
+        found = self.propagate(lines)
+        self.nonogram_Matrix = self.to_matrix()
+        return found
+
+    def solve_parallel(self, processes=None):
+        """
+        Solves nonogram with lines of one kind solved in parallel
+        by a pool of processes (see Parallel.parallel_solve), which
+        pays off for very big nonograms. Pool stops only when no
+        line gives new cells, so its grid is only copied to cells
+        of this nonogram - lines are not solved here again.
+        Returns (and keeps in self.status) status as solve.
+
+        >>> NG = nonogram([[2], [1]], [[1], [2]])
+        >>> NG.solve_parallel(1), NG.nonogram_Matrix, NG.pending
+        ('converged', [[1, 1], [-1, 1]], [])
+        """
+        from Nonogram.Parallel import parallel_solve
+        self.queue.clear()
+        self.queued.clear()
+        try:
+            grid = parallel_solve(self.Rows, self.Columns, processes)
+            for i, j in zip(*np.nonzero(grid)):
+                self.set_cell(i, j, 1 if grid[i][j] > 0 else -1)
+            self.status = CONVERGED
+        except ContradictionError:
+            self.status = CONTRADICTION
+        self.nonogram_Matrix = self.to_matrix()
+        return self.status
+
+    def save_state(self, file):
+        """
+        Saves clues, engine and current state of solving to file:
+        known cells, lines waiting in the queue (with their waves),
+        rounds, status and what is left of the work limit. State is written
+        to temporary file first and then replaces old one, so crash
+        can't leave broken file.
+        """
+        state = {'rows': self.Rows, 'columns': self.Columns,
+                 'engine': self.engine,
+                 'state': [str(Row) for Row in self.iterRows],
+                 'queue': [[kind, number, wave]
+                           for (kind, number), wave in self.queue],
+                 'rounds': self.rounds, 'status': self.status,
+                 'work': None if self.work is None else self.work[0]}
+        with open(file + '.tmp', 'w') as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(file + '.tmp', file)
+
+    @classmethod
+    def load_state(cls, file, budget=None):
+        """
+        Creates nonogram from file written by save_state and
+        continues solving from saved state: lines from the saved
+        queue are solved (for files without queue - lines with
+        known cells). budget - maximal number of line solves (None
+        - no limit); lines which are left stay in the queue, as in
+        solve. Saved contradiction stays a contradiction.
+        Returns the nonogram.
+        Raises ContradictionError if state doesn't match clues.
+        """
+        with open(file) as f:
+            state = json.load(f)
+        NG = cls(state['rows'], state['columns'],
+                 state.get('engine', 'dp'))
+        lines = []
+        for i, row in enumerate(state['state']):
+            for j, x in enumerate(row):
+                if x in '# ':
+                    NG.set_cell(i, j, 1 if x == '#' else -1)
+                    lines += [('row', i), ('column', j)]
+        if state.get('queue') is not None:
+            lines = []
+            for kind, number, wave in state['queue']:
+                NG.push((kind, number), wave)
+        NG.rounds = state.get('rounds', 0)
+        NG.limit(state.get('work'))
+        if state.get('status') == CONTRADICTION:
+            NG.status = CONTRADICTION
+        else:
+            NG.propagate(lines, budget)
+            NG.status = BUDGET if NG.queue else CONVERGED
+        NG.nonogram_Matrix = NG.to_matrix()
+        return NG
+
+    def solve(self, budget=None):
         """
         for columns and rows tries to check if any cell
         must be filled or emptied by checking possible
-        successors and predecessors for every cell. Then
-        transfer this cellsto rows/columns and tries again,
-        until there is no change, or 300 times
-        """
-        i = 0
-        Nonog = ""
-        Nonog2 = ''.join(cell.__str__()
-                         for row in self.iterRows
-                         for cell in row.cells)
-        while Nonog != Nonog2:
-            i += 1
-            if i > 300:
-                return
-            Nonog = Nonog2
-            self.multi_step()
-            self.transpose_check()
-            Nonog2 = ''.join(cell.__str__()
-                             for row in self.iterRows
-                             for cell in row.cells)
-            self.nonogram_Matrix = [[1 * isCellFilled(cell) -
-                                     1 * isCellBlank(cell)
-                                     for cell in Row.cells]
-                                    for Row in self.iterRows]
+        successors and predecessors for every cell. Line
+        is solved again only when its cell was filled or
+        emptied by crossing line. Cells never become unknown
+        again, so solving always ends.
+        budget - maximal number of line solves (None - no limit);
+        next call continues where previous one stopped.
+        Returns (and keeps in self.status) 'converged' when
+        nothing more can be found, 'contradiction' when clues
+        can't be matched or 'budget' when budget was used up.
+
+        >>> NG = nonogram([[2], [1]], [[1], [2]])
+        >>> NG.solve(budget=1)
+        'budget'
+        >>> NG.solve()
+        'converged'
+        >>> NG.nonogram_Matrix
+        [[1, 1], [-1, 1]]
+        """
+        try:
+            self.propagate(None, budget)
+            self.status = BUDGET if self.queue else CONVERGED
+        except ContradictionError:
+            self.status = CONTRADICTION
+        self.nonogram_Matrix = self.to_matrix()
+        return self.status
 
     def check_if_correct(self):
-        matrixRows = [row_to_clues(x)
-                      for x in np.array(self.nonogram_Matrix)]
-        matrixCols = [row_to_clues(x)
-                      for x in np.array(self.nonogram_Matrix).T]
-        return matrixRows == self.Rows and matrixCols == self.Columns
+        if self.verifier is None:
+            self.verifier = ClueVerifier(self.Rows, self.Columns)
+        return self.verifier.check(self.nonogram_Matrix)
+
+    def solved(self):
+        """True when solving gave the whole picture"""
+        return self.status == CONVERGED and \
+            not any(0 in row for row in self.nonogram_Matrix)
+
+    def analyse(self):
+        """
+        Solves nonogram once and returns (and remembers) Analysis:
+        status - 'unique' when line solving gives the whole picture,
+        'nonunique' when it does after some cells are given and
+        'hard' when clues can't be matched; solution - matrix with 1
+        for filled, -1 for empty and 0 for unknown cell; hints -
+        given cells as [row, column, value]. First every single cell
+        is filled on a copy of the already solved nonogram (only its
+        lines and lines crossing new cells are solved again); when one
+        is enough, it is also kept as pair. One cell can't decide more
+        than one component (see components), so then no cell is tried
+        and hints come from minimal_hints for solution found by
+        count_solutions.
+        When limit of work (see limit) is used up, nonogram is 'hard'
+        and solution is None; this result is not remembered.
+
+        >>> nonogram([[1], [1]], [[1], [1]]).analyse()
+        Analysis(status='nonunique', pair=[0, 0], \
+solution=[[1, -1], [-1, 1]], hints=[[0, 0, 1]])
+        """
+        if self.analysis is None:
+            try:
+                self.analysis = self.find_analysis()
+            except BudgetError:
+                return Analysis('hard', [-1, -1], None, [])
+        return self.analysis
+
+    def find_analysis(self):
+        """Does the work of analyse"""
+        if self.status in (None, BUDGET):
+            self.solve()
+        if self.solved():
+            return Analysis('unique', [-1, -1], self.nonogram_Matrix, [])
+        hard = Analysis('hard', [-1, -1], self.nonogram_Matrix, [])
+        if self.status == CONTRADICTION:
+            return hard
+        if len(components(self)) == 1:
+            for i, row in enumerate(self.nonogram_Matrix):
+                for j, value in enumerate(row):
+                    if value != 0:
+                        continue
+                    test = self.copy()
+                    try:
+                        test.set_cell(i, j, 1)
+                        test.propagate([('row', i), ('column', j)])
+                    except ContradictionError:
+                        continue
+                    matrix = test.to_matrix()
+                    if not any(0 in line for line in matrix):
+                        return Analysis('nonunique', [i, j], matrix,
+                                        [[i, j, 1]])
+        count, found = count_solutions(self, limit=1)
+        if not count:
+            return hard
+        solution = [list(row) for row in self.nonogram_Matrix]
+        for (i, j), value in found.items():
+            solution[i][j] = value
+        return Analysis('nonunique', [-1, -1], solution,
+                        minimal_hints(self, solution))
 
     def full_solve(self):
         """
         check uniqueness of solution, then it solves it, or fills
-        one cell to show one possible solution.
+        one cell to show one possible solution (see analyse).
         Also creates array filled with 1 where cell is filled
         and -1 where cell is empty.
         """
-        if check_uniqueness(self.Rows, self.Columns):
-            self.pair = [-1, -1]
-            self.solve()
-        else:
-            self.pair = uniquisation(self.Rows, self.Columns)
-            self.fill(self.pair[0], self.pair[1])
-            self.solve()
-            self.nonogram_Matrix = [[1 * isCellFilled(cell) -
-                                     1 * isCellBlank(cell)
-                                     for cell in Row.cells]
-                                    for Row in self.iterRows]
+        analysis = self.analyse()
+        self.pair, self.hints = analysis.pair, analysis.hints
+        self.nonogram_Matrix = analysis.solution
 
     def fill(self, RowNumber, ColNumber):
         """
@@ -394,7 +923,6 @@ class nonogram:
         return [self.Rows, self.Columns, self.nonogram_Matrix]
 
 
-@timeout(30)
 def check_uniqueness(Rows, Columns):
     """
     Check whether nonogram contains cells
@@ -407,16 +935,19 @@ def check_uniqueness(Rows, Columns):
 
     >>> check_uniqueness([[1],[1]],[[1],[1]])
     False
+
+    Every picture which line solver finishes is unique, also
+    the empty and the completely filled one:
+
+    >>> check_uniqueness([[0], [0]], [[0], [0]])
+    True
     """
     NonoGram = nonogram(Rows, Columns)
     NonoGram.solve()
-    representation = ''.join(row.__str__() for row in NonoGram.iterRows)
-    return '/' not in representation and ' ' in representation \
-           and '#' in representation
+    return NonoGram.solved()
 
 
-@timeout(30)
-def uniquisation(Rows, Columns):
+def uniquisation(Rows, Columns, work=ANALYSIS_WORK):
     """
     Returns coordinates of first cell that if
     filled grants us unique solution
@@ -426,30 +957,322 @@ def uniquisation(Rows, Columns):
     [0, 0]
     >>> uniquisation([[2],[1]],[[1],[2]])
     [-1, -1]
+
+    Gives [-1, -1] also when given work (see nonogram.limit)
+    is not enough to find the cell.
+    """
+    return analyse_clues(Rows, Columns, work).pair
+
+
+Analysis = namedtuple('Analysis', 'status pair solution hints')
+
+
+def analyse_clues(Rows, Columns, work=ANALYSIS_WORK):
+    """
+    Analysis of nonogram (see nonogram.analyse) which gives up
+    after given number of lines solved or copied (see
+    nonogram.limit) - then nonogram is 'hard' and solution is None.
+    The work stops itself, so nothing is left running.
+
+    >>> analyse_clues([[2], [1]], [[1], [2]]).status
+    'unique'
+    >>> analyse_clues([[1], [1]], [[1], [1]], work=3)
+    Analysis(status='hard', pair=[-1, -1], solution=None, hints=[])
     """
     NG = nonogram(Rows, Columns)
-    NG.solve()
-    representation = ''.join(row.__str__() for row in NG.iterRows)
-    if '/' not in representation and ' ' in representation \
-       and '#' in representation:
-        return [-1, -1]
-    for i in range(len(Rows)):
-        for j in range(len(Columns)):
-            NG = nonogram(Rows, Columns)
-            NG.solve()
-            if isCellFilled(NG.iterRows[i].cells[j]) \
-               or isCellBlank(NG.iterRows[i].cells[j]):
-                next
-            NG.fill(i, j)
-            NG.solve()
-            representation = ''.join(row.__str__() for row in NG.iterRows)
-            if '/' not in representation and ' ' in representation \
-               and '#' in representation:
-                return [i, j]
-    return [-1, -1]
+    NG.limit(work)
+    return NG.analyse()
+
+
+Difficulty = namedtuple('Difficulty',
+                        'score rounds lines probes depth capped')
+
+
+def rate_difficulty(Rows, Columns, nodes=10000, work=None):
+    """
+    Rates difficulty from work that solver has to do, so it
+    doesn't depend on speed of computer:
+     - rounds - number of propagation rounds (waves of the queue)
+       before line solving stops,
+     - lines - number of line solves of propagation,
+     - probes - number of cells which had to be tried (filled
+       or emptied) to find a contradiction,
+     - depth - deepest guess needed in search (0 if nonogram
+       can be solved with lines and probing).
+    Score is rounds, plus lines per line of nonogram, plus
+    probes, plus 100 for every level of search. Search stops
+    after given number of nodes. All work is limited to given
+    number of lines (see nonogram.limit; by default RATING_WORK
+    times number of lines of nonogram, as copy of nonogram costs
+    all its lines); when it is used up, rating is capped - score
+    counts only work done so far (and depth 1 if search was
+    started). Contradictory nonograms get infinite score.
+
+    >>> rate_difficulty([[2], [1]], [[1], [2]])
+    Difficulty(score=3.25, rounds=2, lines=5, probes=0, depth=0, \
+capped=False)
+    >>> rate_difficulty([[1], [1]], [[1], [1]], work=3).capped
+    True
+    >>> rate_difficulty([[1], [1]], [[1], [1]]).depth
+    1
+    """
+    NG = nonogram(Rows, Columns)
+    NG.limit(RATING_WORK * (NG.height + NG.width) if work is None
+             else work)
+    probes, depth, rounds, capped = [0], 0, 0, False
+    try:
+        NG.propagate()
+        rounds = NG.rounds
+        probe(NG, probes)
+        if any(0 in row for row in NG.to_matrix()):
+            depth = 1  # if work runs out during the search
+            depth = search_depth(NG, [nodes])
+    except ContradictionError:
+        return Difficulty(float('inf'), NG.rounds, NG.lineSolves, 0, 0,
+                          False)
+    except BudgetError:
+        rounds = rounds or NG.rounds
+        capped = True
+    score = rounds + NG.lineSolves / float(NG.height + NG.width) + \
+        probes[0] + 100 * depth
+    return Difficulty(score, rounds, NG.lineSolves, probes[0], depth,
+                      capped)
+
+
+def probe(NG, count=None):
+    """
+    Tries to fill and to empty every unknown cell; if one of them
+    leads to contradiction, cell gets the other value. Repeats
+    until nothing changes. Returns number of tries (which are
+    also added to count - one-element list - if it is given).
+    Raises ContradictionError if both values are wrong.
+    """
+    count = [0] if count is None else count
+    probes = 0
+    changed = True
+    while changed:
+        changed = False
+        for i, row in enumerate(NG.to_matrix()):
+            for j in range(len(row)):
+                if cell_value(NG.iterRows[i].cells[j]) != 0:
+                    continue
+                for value in (1, -1):
+                    probes += 1
+                    count[0] += 1
+                    test = NG.copy()
+                    try:
+                        test.set_cell(i, j, value)
+                        test.propagate([('row', i), ('column', j)])
+                    except ContradictionError:
+                        NG.lineSolves = test.lineSolves
+                        NG.set_cell(i, j, -value)
+                        NG.propagate([('row', i), ('column', j)])
+                        changed = True
+                        break
+                    NG.lineSolves = test.lineSolves
+    return probes
+
+
+def search_depth(NG, nodes):
+    """
+    Guesses first unknown cell (filled, then empty) and
+    propagates, until first solution is found. Returns maximal
+    depth of guesses. nodes is a one-element list with number
+    of nodes which still can be visited.
+    """
+    unknown = [(i, j) for i, row in enumerate(NG.to_matrix())
+               for j, value in enumerate(row) if value == 0]
+    if not unknown or nodes[0] <= 0:
+        return 0
+    i, j = unknown[0]
+    deepest = 0
+    for value in (1, -1):
+        nodes[0] -= 1
+        test = NG.copy()
+        try:
+            test.set_cell(i, j, value)
+            test.propagate([('row', i), ('column', j)])
+        except ContradictionError:
+            NG.lineSolves = test.lineSolves
+            deepest = max(deepest, 1)
+            continue
+        depth = 1 + search_depth(test, nodes)
+        NG.lineSolves = test.lineSolves
+        deepest = max(deepest, depth)
+        if not any(0 in row for row in test.to_matrix()):
+            break
+    return deepest
+
+
+def components(NG, cells=None):
+    """
+    Splits unknown cells of nonogram (or only given cells) into
+    groups which share no row and no column. Lines of one group
+    don't cross unknown cells of other groups, so every group
+    can be searched alone and solutions of nonogram are all
+    combinations of solutions of groups.
+    Returns list of lists of cells (row, column).
+
+    >>> NG = nonogram([[1], [1, 1], [2, 3], [2, 1, 1], [1, 1, 1], [1]],
+    ...               [[3], [3], [0], [3], [1, 1], [5]])
+    >>> NG.solve()
+    'converged'
+    >>> components(NG)
+    [[(0, 4), (0, 5), (5, 4), (5, 5)], [(1, 0), (1, 1), (4, 0), (4, 1)]]
+    >>> count_solutions(NG, limit=10)[0]
+    4
+    """
+    if cells is None:
+        cells = [(i, j) for i, row in enumerate(NG.to_matrix())
+                 for j, value in enumerate(row) if value == 0]
+    else:
+        cells = [(i, j) for i, j in cells
+                 if cell_value(NG.iterRows[i].cells[j]) == 0]
+    parent = {}
+
+    def find(line):
+        while parent.setdefault(line, line) != line:
+            parent[line] = parent[parent[line]]
+            line = parent[line]
+        return line
+
+    for i, j in cells:
+        parent[find(('row', i))] = find(('column', j))
+    groups = defaultdict(list)
+    for i, j in cells:
+        groups[find(('row', i))].append((i, j))
+    return list(groups.values())
+
+
+def count_solutions(NG, limit=2, cells=None):
+    """
+    Counts solutions of (solved with lines) nonogram, but stops
+    counting at limit. Unknown cells are split into components
+    which are searched one by one, so work is the sum of work for
+    components and not their product; after every guess component
+    is split again. Returns (number of solutions, one solution as
+    dict {(row, column): value} of unknown cells, or None).
+    """
+    count, solution = 1, {}
+    for group in components(NG, cells):
+        number, found = search_component(NG, group, limit)
+        if not number:
+            return 0, None
+        count = min(limit, count * number)
+        solution.update(found)
+    return count, solution
+
+
+def minimal_hints(NG, solution):
+    """
+    Chooses small set of given cells after which line solver gives
+    the whole picture. Values are taken from solution (matrix with
+    1 for filled and -1 for empty cell). Every component (see
+    components) is done alone and greedily: each of its cells is
+    given on a copy of the already propagated nonogram and the one
+    which decides most other cells (filled one if there is a tie)
+    is kept; the rest of the component is split again. Cells decided
+    by a tried cell can't decide more than it, so they are not tried
+    in the same round.
+    Returns list of [row, column, value].
+    Raises ContradictionError if solution doesn't match clues.
+
+    >>> NG = nonogram([[1], [1]], [[1], [1]])
+    >>> NG.solve()
+    'converged'
+    >>> minimal_hints(NG, [[-1, 1], [1, -1]])
+    [[0, 0, -1]]
+    """
+    hints = []
+    groups = components(NG)
+    while groups:
+        group = groups.pop()
+        best, decided = None, set()
+        for i, j in group:
+            if (i, j) in decided:
+                continue
+            test = NG.copy()
+            value = int(solution[i][j])
+            test.set_cell(i, j, value)
+            found = test.propagate([('row', i), ('column', j)])
+            decided.update((a, b) for a, b, _ in found)
+            if best is None or (len(found), value) > \
+                    (len(best[2]), best[0][2]):
+                best = ([i, j, value], test, found)
+                if len(found) + 1 == len(group) and value == 1:
+                    break
+        hint, NG, found = best
+        hints.append(hint)
+        decided = {(a, b) for a, b, _ in found}
+        decided.add(tuple(hint[:2]))
+        groups += components(NG, [cell for cell in group
+                                  if cell not in decided])
+    return hints
+
+
+def search_component(NG, cells, limit):
+    """
+    Guesses first cell of component (filled, then empty),
+    propagates and counts solutions of the rest with
+    count_solutions. Returns the same as count_solutions.
+    """
+    i, j = cells[0]
+    count, solution = 0, None
+    for value in (1, -1):
+        test = NG.copy()
+        try:
+            test.set_cell(i, j, value)
+            test.propagate([('row', i), ('column', j)])
+        except ContradictionError:
+            continue
+        number, found = count_solutions(test, limit - count, cells)
+        if number and solution is None:
+            solution = dict(found)
+            solution.update((cell, cell_value(test.iterRows[cell[0]]
+                                              .cells[cell[1]]))
+                            for cell in cells if cell not in found)
+        count += number
+        if count >= limit:
+            break
+    return count, solution
+
+
+def read_clues(file):
+    """
+    Yields (Rows, Columns) of every nonogram from file (format as
+    in import_from_file). Lines are read as JSON, which is much
+    faster than literal_eval (used only when JSON fails). Broken
+    blocks - like the last one after a write that was
+    interrupted - are skipped.
+    """
+    with open(file) as f:
+        text = f.read()
+    for p in (x.strip() for x in text.split("\n\n")):
+        lines = p.split("\n")
+        try:
+            Rows, Columns = json.loads(lines[0]), json.loads(lines[1])
+        except (ValueError, IndexError):
+            try:
+                Rows, Columns = literal_eval(lines[0]), literal_eval(lines[1])
+            except (ValueError, SyntaxError, IndexError):
+                continue
+        if isinstance(Rows, list) and isinstance(Columns, list):
+            yield Rows, Columns
 
 
-def import_from_file(file):
+def rate_file(file, processes=None):
+    """
+    Rates every nonogram from file in parallel.
+    Returns list of (Rows, Columns, Difficulty).
+    """
+    clues = list(read_clues(file))
+    with multiprocessing.Pool(processes) as pool:
+        ratings = pool.starmap(rate_difficulty, clues)
+    return [(Rows, Columns, rating)
+            for (Rows, Columns), rating in zip(clues, ratings)]
+
+
+def import_from_file(file, index=None, work=ANALYSIS_WORK):
     """
     Checks given file if it contains nonograms schemes with
     pattern as below:
@@ -462,30 +1285,40 @@ def import_from_file(file):
                         <------- one line of space before new nonogram
     [[1,1],[0],[1,1]]   <-------+
     [[1,1],[0],[1,1]]   <-------+--- next nonogram
+    Nonograms which are already in the index (PuzzleIndex) are
+    skipped; mirrored or transposed ones are kept, but they take
+    results of solving from the index instead of being analysed
+    again. Analysis of one nonogram is limited to given work (see
+    nonogram.limit); nonograms which need more are 'hard'.
     """
+    if index is None:
+        index = PuzzleIndex()
     Nonograms = {'unique': [], 'nonunique': [], 'hard': []}
-    for p in (x for x in open(file).read().split("\n\n") if x):
-        NGInput = p.split("\n")
-        try:
-            if check_uniqueness(literal_eval(NGInput[0]),
-                                literal_eval(NGInput[1])):
-                Nonograms['unique'].append(nonogram(literal_eval(NGInput[0]),
-                                                    literal_eval(NGInput[1])))
-            elif uniquisation(literal_eval(NGInput[0]),
-                              literal_eval(NGInput[1])) != [-1, -1]:
-                Nonograms['nonunique'].append(nonogram(literal_eval(NGInput[0]),
-                                                       literal_eval(NGInput[1])))
-            else:
-                Nonograms['hard'].append(nonogram(literal_eval(NGInput[0]),
-                                                  literal_eval(NGInput[1])))
-        except TimeoutError:
-            Nonograms['hard'].append(nonogram(literal_eval(NGInput[0]),
-                                              literal_eval(NGInput[1])))
+    for Rows, Columns in read_clues(file):
+        if not index.add(Rows, Columns):
+            continue
+        known = index.recall(Rows, Columns)
+        NG = nonogram(Rows, Columns)
+        if 'status' in known:
+            status = known['status']
+            if 'solution' in known:
+                NG.analysis = Analysis(status, known['pair'],
+                                       known['solution'], known['hints'])
+            Nonograms[status].append(NG)
+            continue
+        NG.limit(work)
+        status, pair, solution, hints = NG.analyse()
+        if solution is None:
+            NG = nonogram(Rows, Columns)
+            index.remember(Rows, Columns, status)
+        else:
+            NG.limit(None)
+            index.remember(Rows, Columns, status, solution, pair, hints)
+        Nonograms[status].append(NG)
     return Nonograms
 
 
-@timeout(15)
-def import_picture(image_name, N=15, M=15):
+def import_picture(image_name, N=15, M=15, threshold=128):
     """
     Converts given picture to array of given size
     (actual size may differ due to keeping aspect ratio)
@@ -493,14 +1326,104 @@ def import_picture(image_name, N=15, M=15):
     and then converts it to lists of clues
     Returns List of list of clues for rows and for columns
     """
+    return matrix_clues(picture_to_matrix(image_name, N, M, threshold))
+
+
+def picture_to_matrix(image_name, N=15, M=15, threshold=128):
+    """
+    Converts given picture to array of given size with -1 as
+    empty cells and with 1 as filled one. Picture is scaled
+    down in grayscale and only then pixels darker than
+    threshold become filled cells.
+    """
     image_file = Image.open(image_name)  # open colour image
-    image_file = image_file.convert('1')  # convert image to black and white
-    image_file.thumbnail((M, N), Image.ANTIALIAS)
-    image = np.array(image_file)
-    image = 1 - 2 * image
-    Rows = [row_to_clues(x) for x in image]
-    Cols = [row_to_clues(x) for x in image.T]
-    return Rows, Cols
+    image_file = image_file.convert('L')  # convert image to grayscale
+    image_file.thumbnail((M, N), LANCZOS)
+    return np.where(np.array(image_file) < threshold, 1, -1)
+
+
+def picture_to_text(task):
+    """
+    Converts one picture for import_directory. Task is tuple
+    (image_name, N, M, unique). Returns text of nonogram or None
+    if picture can't be opened or (with unique) nonogram
+    doesn't have unique solution.
+    """
+    image_name, N, M, unique = task
+    try:
+        Rows, Cols = import_picture(image_name, N, M)
+    except (IOError, ValueError):
+        return None
+    if unique and not check_uniqueness(Rows, Cols):
+        return None
+    return clues_to_text(Rows, Cols)
+
+
+def import_directory(directory, file, N=15, M=15, unique=False,
+                     processes=None):
+    """
+    Converts every picture (jpg, png, bmp) from directory to
+    nonogram in parallel and writes them to file in the same
+    format as import_from_file reads. With unique=True pictures
+    which don't give nonogram with unique solution are skipped.
+    Returns list of names of converted pictures.
+    """
+    names = sorted(name for name in os.listdir(directory)
+                   if name.lower().endswith(('.jpg', '.png', '.bmp')))
+    tasks = [(os.path.join(directory, name), N, M, unique)
+             for name in names]
+    with multiprocessing.Pool(processes) as pool:
+        texts = pool.map(picture_to_text, tasks)
+    converted = [(name, text) for name, text in zip(names, texts) if text]
+    with open(file, 'w') as f:
+        f.write('\n\n'.join(text for name, text in converted))
+    return [name for name, text in converted]
+
+
+def clues_to_text(Rows, Columns):
+    """
+    Writes clues in the format of nonogram files
+
+    >>> print(clues_to_text([[2], [1]], [[1], [2]]))
+    [[2],[1]]
+    [[1],[2]]
+    """
+    return str(Rows).replace(' ', '') + '\n' + str(Columns).replace(' ', '')
+
+
+def matrix_to_clues(matrix):
+    """
+    Converts every row of a matrix with -1 (empty cell) and 1
+    (filled cell) to a list of clues at once. Runs are found
+    from differences between neighbouring cells.
+
+    >>> matrix_to_clues([[1, 1, -1, 1], [-1, -1, -1, -1], [1, -1, 1, 1]])
+    [[2, 1], [0], [1, 2]]
+    """
+    filled = np.asarray(matrix) > 0
+    if filled.ndim != 2 or filled.shape[0] == 0:
+        return [[0] for _ in range(len(filled))]
+    height, width = filled.shape
+    padded = np.zeros((height, width + 2), dtype=np.int8)
+    padded[:, 1:-1] = filled
+    change = np.diff(padded, axis=1)
+    startRows, starts = np.nonzero(change == 1)
+    ends = np.nonzero(change == -1)[1]
+    counts = np.bincount(startRows, minlength=height)
+    lengths = np.split(ends - starts, np.cumsum(counts)[:-1])
+    return [x.tolist() if len(x) else [0] for x in lengths]
+
+
+def matrix_clues(matrix):
+    """
+    Returns clues for all rows and for all columns of a matrix
+    with -1 (empty cell) and 1 (filled cell).
+
+    >>> matrix_clues([[1, 1], [-1, 1]])
+    ([[2], [1]], [[1], [2]])
+    """
+    matrix = np.asarray(matrix)
+    return matrix_to_clues(matrix), matrix_to_clues(matrix.T)
 
 
 def row_to_clues(X):
@@ -529,6 +1452,253 @@ def row_to_clues(X):
     return U
 
 
+class LineTracker:
+    """
+    Keeps track which rows and columns of a board already
+    match their clues. After a click only the row and the
+    column of clicked cell are checked again, so a click
+    costs O(N + M) instead of checking the whole board.
+
+    >>> tracker = LineTracker([[1], [1]], [[1], [1]])
+    >>> tracker.update([[1, 0], [0, 0]], 0, 0)
+    [('row', 0, True), ('column', 0, True)]
+    >>> tracker.done()
+    False
+    >>> _ = tracker.update([[1, 0], [0, 1]], 1, 1)
+    >>> tracker.done()
+    True
+    """
+    def __init__(self, rows, columns):
+        self.rows = rows
+        self.columns = columns
+        self.reset()
+
+    def reset(self):
+        """Marks every line as not satisfied yet"""
+        self.rowsDone = [row_to_clues([]) == row for row in self.rows]
+        self.columnsDone = [row_to_clues([]) == col for col in self.columns]
+        self.satisfied = sum(self.rowsDone) + sum(self.columnsDone)
+
+    def check(self, kind, number, line):
+        """
+        Checks one line (1 - filled cell, anything else - empty)
+        and returns (kind, number, satisfied) if its status changed.
+        """
+        if kind == 'row':
+            done, clues = self.rowsDone, self.rows
+        else:
+            done, clues = self.columnsDone, self.columns
+        now = matrix_to_clues([line])[0] == clues[number]
+        if now == done[number]:
+            return None
+        done[number] = now
+        self.satisfied += 1 if now else -1
+        return (kind, number, now)
+
+    def update(self, matrix, row, column):
+        """
+        Checks row and column of changed cell. Returns list of
+        lines which status changed.
+        """
+        changes = [self.check('row', row, matrix[row]),
+                   self.check('column', column,
+                              [r[column] for r in matrix])]
+        return [change for change in changes if change is not None]
+
+    def done(self):
+        """True if every row and column matches its clues"""
+        return self.satisfied == len(self.rows) + len(self.columns)
+
+
+def line_fits(clues, line):
+    """
+    True if line of player's board (1 - filled, -1 - crossed,
+    0 - unknown cell) can still match its clues. Works from the end
+    of the line: for every clue it marks places from which the rest
+    of the line can match this and following clues, so it costs
+    O(length * number of clues).
+
+    >>> line_fits([2, 1], [0, 1, -1, 0, 0])
+    True
+    >>> line_fits([2, 1], [0, 1, 1, 1, 0])
+    False
+    >>> line_fits([0], [0, -1, 0])
+    True
+    """
+    n = len(line)
+    crossed = [0]
+    for value in line:
+        crossed.append(crossed[-1] + (value == -1))
+    fits = [True] * (n + 1)
+    for place in range(n - 1, -1, -1):
+        fits[place] = fits[place + 1] and line[place] != 1
+    for clue in reversed([clue for clue in clues if clue]):
+        after = fits
+        fits = [False] * (n + 1)
+        for place in range(n - clue, -1, -1):
+            end = place + clue
+            fits[place] = line[place] != 1 and fits[place + 1]
+            if not fits[place] and crossed[end] == crossed[place]:
+                fits[place] = after[n] if end == n else \
+                    line[end] != 1 and after[end + 1]
+    return fits[0]
+
+
+class MistakeChecker:
+    """
+    Keeps lines of player's board which can't match their clues
+    any more (see line_fits). It needs no solution, so it works for
+    nonograms with many solutions too. After a click only the row
+    and the column of clicked cell are checked again.
+
+    >>> checker = MistakeChecker([[2], [1]], [[1], [2]])
+    >>> checker.update([[1, -1], [0, 0]], 0, 1)
+    [('row', 0, True), ('column', 1, True)]
+    >>> checker.update([[1, 0], [0, 0]], 0, 1)
+    [('row', 0, False), ('column', 1, False)]
+    """
+    def __init__(self, rows, columns):
+        self.rows = rows
+        self.columns = columns
+        self.reset()
+
+    def reset(self):
+        """Forgets all mistakes"""
+        self.wrong = set()
+
+    def check(self, kind, number, line):
+        """
+        Checks one line and returns (kind, number, wrong) if its
+        status changed.
+        """
+        clues = self.rows if kind == 'row' else self.columns
+        now = not line_fits(clues[number], line)
+        if now == ((kind, number) in self.wrong):
+            return None
+        if now:
+            self.wrong.add((kind, number))
+        else:
+            self.wrong.discard((kind, number))
+        return (kind, number, now)
+
+    def update(self, matrix, row, column):
+        """
+        Checks row and column of changed cell. Returns list of
+        lines which status changed.
+        """
+        changes = [self.check('row', row, list(matrix[row])),
+                   self.check('column', column,
+                              [r[column] for r in matrix])]
+        return [change for change in changes if change is not None]
+
+
+class ClueVerifier:
+    """
+    Checks candidate pictures against clues which are compiled
+    to arrays only once. Cheap checks go first (number of filled
+    cells, then number of groups in every line, then lengths of
+    groups), and checking stops at the first one that fails.
+    Candidates can be matrices with 1 as filled cell (also
+    PackedGrid) or rows packed with np.packbits, also many
+    candidates at once.
+
+    >>> verifier = ClueVerifier([[2], [1]], [[1], [2]])
+    >>> verifier.check([[1, 1], [-1, 1]])
+    True
+    >>> verifier.check_packed(np.packbits([[1, 1], [1, 0]], axis=1))
+    False
+    >>> verifier.check_many([[[1, 1], [0, 1]], [[1, 1], [1, 0]]]).tolist()
+    [True, False]
+    """
+    def __init__(self, Rows, Columns):
+        self.height = len(Rows)
+        self.width = len(Columns)
+        self.rowSums = np.array([sum(x) for x in Rows])
+        self.colSums = np.array([sum(x) for x in Columns])
+        self.rowCounts = np.array([len([c for c in x if c]) for x in Rows])
+        self.colCounts = np.array([len([c for c in x if c])
+                                   for x in Columns])
+        self.rowRuns = np.array([c for x in Rows for c in x if c], dtype=int)
+        self.colRuns = np.array([c for x in Columns for c in x if c],
+                                dtype=int)
+
+    def check(self, matrix):
+        """Checks one matrix where 1 (or any positive) is filled cell"""
+        return bool(self.check_many(np.asarray(matrix)[None])[0])
+
+    def check_packed(self, rows):
+        """Checks one matrix with rows packed by np.packbits"""
+        return bool(self.check_packed_many(np.asarray(rows)[None])[0])
+
+    def check_packed_many(self, grids):
+        """Checks stack of matrices with rows packed by np.packbits"""
+        grids = np.asarray(grids, dtype=np.uint8)
+        return self.check_many(np.unpackbits(grids, axis=2,
+                                             count=self.width))
+
+    def check_many(self, grids, rows=None, columns=None):
+        """
+        Checks stack of matrices (candidates x rows x columns).
+        If lists of rows and columns are given, only these lines
+        are checked. Returns array which is True for candidates
+        matching clues.
+        """
+        filled = np.asarray(grids) > 0
+        if filled.shape[1:] != (self.height, self.width):
+            return np.zeros(len(filled), dtype=bool)
+        if rows is None and columns is None:
+            lines = ((filled, self.rowSums, self.rowCounts, self.rowRuns),
+                     (filled.transpose(0, 2, 1), self.colSums,
+                      self.colCounts, self.colRuns))
+        else:
+            rows = np.arange(self.height) if rows is None \
+                else np.asarray(rows, dtype=int)
+            columns = np.arange(self.width) if columns is None \
+                else np.asarray(columns, dtype=int)
+            lines = ((filled[:, rows], self.rowSums[rows],
+                      self.rowCounts[rows],
+                      select_runs(self.rowRuns, self.rowCounts, rows)),
+                     (filled.transpose(0, 2, 1)[:, columns],
+                      self.colSums[columns], self.colCounts[columns],
+                      select_runs(self.colRuns, self.colCounts, columns)))
+        ok = np.ones(len(filled), dtype=bool)
+        for cells, sums, _, _ in lines:
+            ok &= (cells.sum(axis=2) == sums).all(axis=1)
+        for cells, _, counts, runs in lines:
+            if not ok.any():
+                break
+            ok[ok] = lines_match(cells[ok], counts, runs)
+        return ok
+
+
+def select_runs(runs, counts, lines):
+    """Lengths of groups (concatenated) of given lines only"""
+    ends = np.cumsum(counts)
+    return np.concatenate([runs[ends[n] - counts[n]:ends[n]]
+                           for n in lines] + [np.zeros(0, dtype=int)])
+
+
+def lines_match(lines, counts, runs):
+    """
+    Compares groups in lines of every candidate (candidates x lines
+    x cells) with number of groups in each line and concatenated
+    lengths of groups. Returns array with result for every candidate.
+    """
+    number, height, width = lines.shape
+    padded = np.zeros((number * height, width + 2), dtype=np.int8)
+    padded[:, 1:-1] = lines.reshape(number * height, width)
+    change = np.diff(padded, axis=1)
+    startLines, starts = np.nonzero(change == 1)
+    ends = np.nonzero(change == -1)[1]
+    found = np.bincount(startLines, minlength=number * height)
+    ok = (found.reshape(number, height) == counts).all(axis=1)
+    owner = startLines // height
+    keep = ok[owner]
+    wrong = (ends - starts)[keep] != np.tile(runs, ok.sum())
+    ok[owner[keep][wrong]] = False
+    return ok
+
+
 @timeout(60)
 def brutforce_unique(nono):
     """
@@ -538,28 +1708,49 @@ def brutforce_unique(nono):
     for example:
 
     >>> brutforce_unique(nonogram([[1],[1]],[[1],[1]]))
-    [(1, 2), (0, 3)]
+    [(0, 3), (1, 2)]
 
     whete each number can be written as:
     Number = x * (length of row) + y
     and that would mean that Number indicates cell
     in x-th row and in y-th column
+    Only cells which line solver can't decide are tried, and
+    they are tried for every component (see components) alone,
+    so options of different components are not multiplied.
     """
-    results = []
-    rowssum = sum([sum(x) for x in nono.Rows])
-    S = set(itertools.combinations(range(len(nono.Rows) *
-                                         len(nono.Columns)),
-                                   rowssum))
-    for TrySet in S:
-        nonogram1 = nonogram(nono.Rows, nono.Columns)
-        for x in TrySet:
-            nonogram1.fill(int(x % nonogram1.width), int(x / nonogram1.width))
-            nonogram1.nonogram_Matrix = np.array([[-1 + 2 * isCellFilled(cell)
-                                                   for cell in R.cells]
-                                                  for R in nonogram1.iterRows])
-        if nonogram1.check_if_correct():
-            results.append(TrySet)
-    return results
+    NG = nonogram(nono.Rows, nono.Columns)
+    try:
+        NG.propagate()
+    except ContradictionError:
+        return []
+    matrix = np.array(NG.to_matrix())
+    verifier = ClueVerifier(NG.Rows, NG.Columns)
+    choices = []
+    for group in components(NG):
+        rows = sorted({i for i, _ in group})
+        cols = sorted({j for _, j in group})
+        need = sum(sum(NG.Rows[i]) for i in rows) - (matrix[rows] > 0).sum()
+        base = np.where(matrix > 0, 1, -1)
+        places = np.array(group)
+        numbers = [i * NG.width + j for i, j in group]
+        S = list(itertools.combinations(range(len(group)), need))
+        found = []
+        for start in range(0, len(S), 4096):
+            TrySets = np.array(S[start:start + 4096], dtype=int)
+            TrySets = TrySets.reshape(len(TrySets), need)
+            grids = np.repeat(base[None], len(TrySets), axis=0)
+            grids[np.arange(len(TrySets))[:, None],
+                  places[TrySets, 0], places[TrySets, 1]] = 1
+            found += [tuple(numbers[k] for k in TrySet) for TrySet, ok
+                      in zip(TrySets, verifier.check_many(grids, rows, cols))
+                      if ok]
+        if not found:
+            return []
+        choices.append(found)
+    known = [int(i) * NG.width + int(j)
+             for i, j in zip(*np.nonzero(matrix > 0))]
+    return sorted(tuple(sorted(known + [x for part in parts for x in part]))
+                  for parts in itertools.product(*choices))
 
 
 if __name__ == "__main__":
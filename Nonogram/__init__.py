@@ -1,8 +1,14 @@
 from Nonogram.GUI import *
 from Nonogram.Hard_GUI import *
 from Nonogram.Solver import *
+from Nonogram.Library import Library
 import numpy as np
+import threading
 from PIL import Image
+try:
+    import Queue as queue
+except ImportError:
+    import queue
 try:
     import Tkinter as tk
     from Tkinter import BOTH, Listbox, StringVar, END, Menu
@@ -17,8 +23,14 @@ except ImportError:
 class Nono_Main(Frame):
     '''
     It is GUI for player to choose nonogram,
-    or to import from text file or picture
+    or to import from text file or picture.
+    List shows only names of nonograms which fit in it, and only
+    these (or selected one) are classified (unique, NUS, HARD) -
+    in the background, so even very big files open at once.
     '''
+    prefixes = {None: '? ', 'unique': '', 'nonunique': 'NUS ',
+                'hard': 'HARD '}
+
     def __init__(self, parent):
         Frame.__init__(self, parent)
 
@@ -32,35 +44,50 @@ class Nono_Main(Frame):
         within GUI
         '''
         self.parent.title("Nonograms")
-        base_nonograms = import_from_file("Nonogram base.txt")
-        self.all_nonograms = []
+        self.index = PuzzleIndex()
+        self.library = Library("Nonogram base.txt")
+        self.names = []
+        self.clues = []
+        self.statuses = []
+        self.ids = []
+        self.ratings = {}
+        self.sorting = False
+        self.waiting = None
+        self.first = 0
+        self.generation = 0
+        self.queued = set()
+        self.tasks = queue.LifoQueue()
+        self.results = queue.Queue()
+        self.rating_tasks = queue.Queue()
+        for work in (self.classify_nonograms, self.rate_nonograms):
+            worker = threading.Thread(target=work)
+            worker.daemon = True
+            worker.start()
         menubar = tk.Menu(self.parent)
         self.parent.config(menu=menubar)
         self.fl = ""
         fileMenu = tk.Menu(menubar)
         fileMenu.add_command(label="Export", command=self.export)
+        fileMenu.add_command(label="Compact", command=self.compact)
         fileMenu.add_command(label="Open", command=self.onOpen)
+        fileMenu.add_command(label="Sort by difficulty",
+                             command=self.sort_by_difficulty)
         fileMenu.add_command(label="Exit", command=self.onExit)
         menubar.add_cascade(label="File", menu=fileMenu)
 
         self.pack(fill=tk.BOTH, expand=1)
-        nonos = []
-        for n in range(len(base_nonograms['unique'])):
-            nonos.append('Nonogram ' + str(len(self.all_nonograms) + n))
-        self.all_nonograms += base_nonograms['unique']
-        for n in range(len(base_nonograms['nonunique'])):
-            nonos.append('NUS Nonogram ' + str(len(self.all_nonograms) + n))
-        self.all_nonograms += base_nonograms['nonunique']
-        for n in range(len(base_nonograms['hard'])):
-            nonos.append('HARD Nonogram ' + str(len(self.all_nonograms) + n))
-        self.all_nonograms += base_nonograms['hard']
-        self.lb = tk.Listbox(self)
-        for i in nonos:
-            self.lb.insert(tk.END, i)
+        self.height = 10
+        self.lb = tk.Listbox(self, height=self.height)
+        self.scroll = tk.Scrollbar(self, command=self.on_scroll)
 
         self.lb.bind("<<ListboxSelect>>", self.onSelect)
+        self.lb.bind("<MouseWheel>", self.on_wheel)
+        self.lb.bind("<Button-4>", self.on_wheel)
+        self.lb.bind("<Button-5>", self.on_wheel)
 
         self.lb.place(x=20, y=40)
+        self.scroll.place(x=20 + self.lb.winfo_reqwidth(), y=40,
+                          height=self.lb.winfo_reqheight())
 
         info1 = Label(self, text='Select nonogram:')
         info1.place(x=30, y=10)
@@ -78,28 +105,179 @@ class Nono_Main(Frame):
         self.info4 = Label(self, text="Rows:")
         self.ySize = tk.Entry(self, width=5)
 
+        self.add_nonograms(read_clues("Nonogram base.txt"), 'Nonogram')
+        self.after(100, self.poll)
+
+    def add_nonograms(self, clues, name):
+        '''
+        Adds nonograms (list of (Rows, Columns)) which are not yet
+        on the list, without solving them. Returns how many were added.
+        '''
+        added = 0
+        for Rows, Columns in clues:
+            if not self.index.add(Rows, Columns):
+                continue
+            self.names.append('%s %d' % (name, len(self.names)))
+            self.clues.append((Rows, Columns))
+            self.statuses.append(None)
+            self.ids.append(len(self.ids))
+            if self.sorting:
+                self.rate(len(self.ids) - 1)
+            added += 1
+        self.show()
+        return added
+
+    def label(self, n):
+        '''Name of n-th nonogram with its class'''
+        return self.prefixes[self.statuses[n]] + self.names[n]
+
+    def show(self):
+        '''
+        Puts names of nonograms which fit in the list into it
+        and orders their classification.
+        '''
+        self.first = max(0, min(self.first, len(self.names) - self.height))
+        self.lb.delete(0, tk.END)
+        for n in range(self.first,
+                       min(len(self.names), self.first + self.height)):
+            self.lb.insert(tk.END, self.label(n))
+            self.classify(n)
+        total = float(max(1, len(self.names)))
+        self.scroll.set(self.first / total,
+                        min(1.0, (self.first + self.height) / total))
+
+    def on_scroll(self, action, amount, unit=None):
+        '''Moves visible part of the list after using scrollbar'''
+        if action == 'moveto':
+            self.first = int(float(amount) * len(self.names))
+        elif unit == 'pages':
+            self.first += int(amount) * self.height
+        else:
+            self.first += int(amount)
+        self.show()
+
+    def on_wheel(self, event):
+        '''Scrolls the list with mouse wheel'''
+        up = event.num == 4 or getattr(event, 'delta', 0) > 0
+        self.on_scroll('scroll', -1 if up else 1, 'units')
+        return 'break'
+
+    def classify(self, n):
+        '''
+        Orders classification of n-th nonogram in the background,
+        unless it is already known.
+        '''
+        if self.statuses[n] is not None or n in self.queued:
+            return
+        known = self.index.recall(*self.clues[n]) or {}
+        if 'status' in known:
+            self.statuses[n] = known['status']
+            return
+        self.queued.add(n)
+        self.tasks.put((self.generation, n, self.clues[n]))
+
+    def classify_nonograms(self):
+        '''
+        Works in the background thread: classifies nonograms
+        from the queue of tasks and puts results to other queue
+        (widgets are changed only by poll). Nonograms which were
+        scrolled away before their turn are skipped, but not the
+        selected one (its number is None).
+        '''
+        while True:
+            generation, n, clues = self.tasks.get()
+            if n is None or self.first <= n < self.first + self.height:
+                analysis = analyse_clues(*clues)
+            else:
+                analysis = None
+            self.results.put(('class', generation, n, clues, analysis))
+
+    def rate_nonograms(self):
+        '''
+        Works in the background thread: rates nonograms from the
+        queue of ratings (work of one is bounded, see rate_difficulty)
+        '''
+        while True:
+            number, clues = self.rating_tasks.get()
+            self.results.put(('rating', number,
+                              rate_difficulty(*clues)))
+
+    def poll(self):
+        '''
+        Shows classes of nonograms which were classified and sorts
+        the list again when new ratings came
+        '''
+        rated = False
+        while not self.results.empty():
+            result = self.results.get()
+            if result[0] == 'rating':
+                self.ratings[result[1]] = result[2]
+                rated = True
+                continue
+            _, generation, n, clues, analysis = result
+            if analysis is not None:
+                self.remember(clues, analysis)
+                if clues is self.waiting:
+                    self.waiting = None
+                    self.info3.configure(text="")
+                    self.after_idle(self.open_nonogram, clues)
+            if n is None or generation != self.generation:
+                continue
+            self.queued.discard(n)
+            if analysis is None:
+                if self.first <= n < self.first + self.height:
+                    self.classify(n)
+                continue
+            self.statuses[n] = analysis.status
+            if self.first <= n < self.first + self.height:
+                self.lb.delete(n - self.first)
+                self.lb.insert(n - self.first, self.label(n))
+        if rated and self.sorting:
+            self.resort()
+        self.after(100, self.poll)
+
+    def remember(self, clues, analysis):
+        '''Keeps results of analysis in the index'''
+        status, pair, solution, hints = analysis
+        if solution is None:
+            self.index.remember(clues[0], clues[1], status)
+        else:
+            self.index.remember(clues[0], clues[1], status, solution, pair,
+                                hints)
+
     def onSelect(self, val):
         '''
         When player selects nonogram from list,
         new window appears with this particular
-        nonogram.
+        nonogram. If it is not classified yet, it is
+        classified first in the background and window
+        appears when it is done (see poll).
         '''
         sender = val.widget
-        num = sender.curselection()[0]
-        current_nonogram = self.all_nonograms[num]
+        if not sender.curselection():
+            return
+        clues = self.clues[self.first + sender.curselection()[0]]
+        known = self.index.recall(*clues) or {}
+        if 'status' in known and (known['status'] == 'hard' or
+                                  'solution' in known):
+            self.open_nonogram(clues)
+            return
+        self.waiting = clues
+        self.info3.configure(text="Classifying...")
+        self.tasks.put((self.generation, None, clues))
+
+    def open_nonogram(self, clues):
+        '''Opens window with classified nonogram'''
+        Rows, Columns = clues
+        known = self.index.recall(Rows, Columns)
+        self.show()
         master = tk.Tk()
-        if 'HARD' not in sender.get(sender.curselection())\
-           and 'Picture' not in sender.get(sender.curselection()):
-            current_nonogram.solve()
-            current_nonogram.full_solve()
-            app = ShowNono(master, current_nonogram.Rows,
-                           current_nonogram.Columns,
-                           current_nonogram.nonogram_Matrix,
-                           current_nonogram.pair)
+        if known['status'] != 'hard':
+            app = ShowNono(master, Rows, Columns, known['solution'],
+                           givens=known.get('hints', []))
             app.mainloop()
         else:
-            app = ShowNonoHard(master, current_nonogram.Rows,
-                               current_nonogram.Columns)
+            app = ShowNonoHard(master, Rows, Columns)
             app.mainloop()
 
     def onBrowse(self):
@@ -148,38 +326,68 @@ class Nono_Main(Frame):
         to the list.
         '''
         if self.fl[-3:] == "txt":
-            base_nonograms = import_from_file(self.fl)
             name = self.fl.split("/")[-1].split(".")[0]
-            nonos = []
-            for n in range(len(base_nonograms['unique'])):
-                nonos.append('My ' + name + ' ' +
-                             str(len(self.all_nonograms) + n))
-            self.all_nonograms += base_nonograms['unique']
-            for n in range(len(base_nonograms['nonunique'])):
-                nonos.append('My NUS ' + name + ' ' +
-                             str(len(self.all_nonograms) + n))
-            self.all_nonograms += base_nonograms['nonunique']
-            for n in range(len(base_nonograms['hard'])):
-                nonos.append('HARD ' + name + ' ' +
-                             str(len(self.all_nonograms) + n))
-            self.all_nonograms += base_nonograms['hard']
-            for i in nonos:
-                self.lb.insert(tk.END, i)
+            self.add_nonograms(read_clues(self.fl), 'My ' + name)
         elif self.fl[-3:] in ['jpg', 'png', 'bmp']:
             name = self.fl.split("/")[-1].split(".")[0]
             rows, cols = import_picture(self.fl,
                                         int(self.ySize.get()),
                                         int(self.ySize.get()))
-            ngram = nonogram(rows, cols)
-            self.lb.insert(tk.END, "Picture " + name + ' ' +
-                           str(len(self.all_nonograms)))
-            self.all_nonograms.append(ngram)
             self.ySize.destroy()
             self.info4.destroy()
+            if not self.add_nonograms([(rows, cols)], 'Picture ' + name):
+                self.convert.destroy()
+                self.info3.configure(text="Already on the list")
+                return
 
         self.convert.destroy()
         self.info3.configure(text="")
 
+    def sort_by_difficulty(self):
+        '''
+        Orders rating of every nonogram from the list in the
+        background (ratings are remembered). List is sorted from
+        the easiest one as ratings come (see poll).
+        '''
+        self.sorting = True
+        for n in range(len(self.ids)):
+            self.rate(n)
+        self.first = 0
+        self.resort()
+
+    def rate(self, n):
+        '''Orders rating of n-th nonogram, unless it is already ordered'''
+        if self.ids[n] not in self.ratings:
+            self.ratings[self.ids[n]] = None
+            self.rating_tasks.put((self.ids[n], self.clues[n]))
+
+    def resort(self):
+        '''
+        Sorts list by known ratings (nonograms which are not rated
+        yet go to the end) and adds difficulty to names; + marks
+        rating which was capped (see rate_difficulty).
+        '''
+        ratings = [self.ratings.get(number) for number in self.ids]
+
+        def key(n):
+            if ratings[n] is None:
+                return (1, False, 0)
+            return (0, ratings[n].capped or ratings[n].score == float('inf'),
+                    ratings[n].score)
+
+        order = sorted(range(len(self.ids)), key=key)
+        names = [name.split(' [')[0] for name in self.names]
+        self.names = [names[n] if ratings[n] is None else
+                      '%s [%.1f%s]' % (names[n], ratings[n].score,
+                                       '+' if ratings[n].capped else '')
+                      for n in order]
+        self.clues = [self.clues[n] for n in order]
+        self.statuses = [self.statuses[n] for n in order]
+        self.ids = [self.ids[n] for n in order]
+        self.generation += 1
+        self.queued = set()
+        self.show()
+
     def onOpen(self):
         self.onBrowse()
 
@@ -188,12 +396,16 @@ class Nono_Main(Frame):
 
     def export(self):
         '''
-        Saves all nonograms from the list to "Nonogram base.txt" so
-        they will be loaded on next opening.
+        Adds nonograms from the list which are not yet in
+        "Nonogram base.txt" to the end of this file, so they
+        will be loaded on next opening.
+        '''
+        for Rows, Columns in self.clues:
+            self.library.add(Rows, Columns)
+
+    def compact(self):
+        '''
+        Rewrites "Nonogram base.txt" so it contains exactly
+        nonograms from the list.
         '''
-        text = [str(nonogram.Rows) + '\n' + str(nonogram.Columns)
-                for nonogram in self.all_nonograms]
-        new_text = '\n\n'.join(text)
-        f = open('Nonogram base.txt', 'w')
-        f.write(new_text)
-        f.close
+        self.library.compact(self.clues)
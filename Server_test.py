@@ -0,0 +1,91 @@
+from Nonogram.Server import SolverServer, analyse, valid_clues
+import urllib.request
+import urllib.error
+import contextlib
+import unittest
+import asyncio
+import json
+import io
+
+
+def post(port, data):
+    request = urllib.request.Request('http://127.0.0.1:%d/solve' % port,
+                                     data=json.dumps(data).encode(),
+                                     method='POST')
+    try:
+        with urllib.request.urlopen(request) as answer:
+            return answer.status, json.loads(answer.read())
+    except urllib.error.HTTPError as error:
+        return error.code, json.loads(error.read())
+
+
+class serverTestCase(unittest.TestCase):
+
+    def ask(self, *requests, kind=SolverServer):
+        async def run():
+            server = kind(port=0, workers=1)
+            await server.start()
+            loop = asyncio.get_running_loop()
+            try:
+                return [await loop.run_in_executor(None, post,
+                                                   server.port, request)
+                        for request in requests]
+            finally:
+                await server.close()
+        return asyncio.run(run())
+
+    def test_solve(self):
+        clues = {'rows': [[2], [1]], 'columns': [[1], [2]]}
+        first, second = self.ask(clues, clues)
+        self.assertEqual(first[0], 200)
+        self.assertEqual(first[1]['status'], 'unique')
+        self.assertEqual(first[1]['solution'], [[1, 1], [-1, 1]])
+        self.assertFalse(first[1]['cached'])
+        self.assertTrue(second[1]['cached'])
+
+    def test_symmetric_clues(self):
+        first, second = self.ask({'rows': [[2], [1]], 'columns': [[1], [2]]},
+                                 {'rows': [[1], [2]], 'columns': [[2], [1]]})
+        self.assertTrue(second[1]['cached'])
+        self.assertEqual(second[1]['solution'], [[1, -1], [1, 1]])
+
+    def test_wrong_clues(self):
+        answers = self.ask({'rows': [[3]], 'columns': [[1]]}, [1])
+        self.assertEqual([status for status, _ in answers], [400, 400])
+
+    def test_deadline(self):
+        status, answer = self.ask({'rows': [[1]], 'columns': [[1]],
+                                   'deadline': 0})[0]
+        self.assertEqual(status, 504)
+
+    def test_internal_error(self):
+        class BrokenServer(SolverServer):
+            async def solve(self, Rows, Columns, deadline=None):
+                raise RuntimeError('broken')
+        with self.assertLogs('Nonogram.Server', 'ERROR'):
+            status, answer = self.ask({'rows': [[1]], 'columns': [[1]]},
+                                      kind=BrokenServer)[0]
+        self.assertEqual((status, answer), (500, {'error': 'internal error'}))
+
+    def test_analyse_budget(self):
+        result = analyse([[1], [1]], [[1], [1]], work=3)
+        self.assertEqual(result['status'], 'hard')
+        self.assertIn(result['solution'].tolist(), [[[1, -1], [-1, 1]],
+                                                    [[-1, 1], [1, -1]]])
+        self.assertFalse(result['limited'])
+        result = analyse([[1], [1]], [[1], [1]], deadline=0)
+        self.assertEqual((result['status'], result['limited']),
+                         ('hard', True))
+        self.assertEqual(result['solution'].tolist(), [[0, 0], [0, 0]])
+
+    def test_valid_clues(self):
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            self.assertFalse(valid_clues([[3]], [[1]]))
+            self.assertFalse(valid_clues([[1, 1]], [[1], [1]]))
+        self.assertEqual(out.getvalue(), '')
+        self.assertFalse(valid_clues([[True], [False]], [[True], [False]]))
+        self.assertTrue(valid_clues([[1], [0]], [[1], [0]]))
+
+
+suite = unittest.TestLoader().loadTestsFromTestCase(serverTestCase)
+print(unittest.TextTestRunner(verbosity=3).run(suite))
@@ -0,0 +1,72 @@
+from Nonogram import Solver
+from Nonogram.Parallel import parallel_solve
+from Nonogram.Generator import random_grid
+import numpy as np
+import timeit
+import os
+
+
+def bench(name, function, number=5):
+    '''Prints the best time of one call of function'''
+    best = min(timeit.repeat(function, number=number, repeat=3)) / number
+    print('%-40s %10.3f ms' % (name, best * 1000))
+    return best
+
+
+def bench_clues(size=200):
+    '''Compares per-line and whole-matrix clue extraction'''
+    matrix = np.random.RandomState(0).choice([-1, 1], size=(size, size))
+    print('Clues of %dx%d matrix' % (size, size))
+    loop = bench('row_to_clues for every line',
+                 lambda: ([Solver.row_to_clues(x) for x in matrix],
+                          [Solver.row_to_clues(x) for x in matrix.T]))
+    vector = bench('matrix_clues', lambda: Solver.matrix_clues(matrix))
+    print('%-40s %10.1f x' % ('speedup', loop / vector))
+
+
+def bench_verifier(size=20, number=10000):
+    '''Measures how many candidates ClueVerifier checks per second'''
+    random = np.random.RandomState(0)
+    solution = random.choice([-1, 1], size=(size, size))
+    verifier = Solver.ClueVerifier(*Solver.matrix_clues(solution))
+    grids = np.repeat((solution > 0)[None], number, axis=0)
+    flips = random.randint(0, size, size=(number, 2))
+    grids[np.arange(number), flips[:, 0], flips[:, 1]] ^= True
+    print('Verifying %d candidates %dx%d' % (number, size, size))
+    best = bench('ClueVerifier.check_many', lambda: verifier.check_many(grids))
+    packed = np.packbits(grids, axis=2)
+    bench('ClueVerifier.check_packed_many',
+          lambda: verifier.check_packed_many(packed))
+    print('%-40s %10.0f /s' % ('candidates', number / best))
+
+
+def bench_line_engines(size=100):
+    '''Compares set passes and exact DP as engines of line solver'''
+    grid = random_grid(size, size, 0.6, np.random.RandomState(1))
+    Rows, Columns = Solver.matrix_clues(grid)
+    print('Solving %dx%d nonogram' % (size, size))
+    times = [bench('solve with %s engine' % engine,
+                   lambda: Solver.nonogram(Rows, Columns, engine).solve(),
+                   number=1)
+             for engine in ('sets', 'dp')]
+    print('%-40s %10.1f x' % ('speedup', times[0] / times[1]))
+
+
+def bench_parallel(size=100):
+    '''Compares parallel line solving with one and with all cores'''
+    grid = random_grid(size, size, 0.6, np.random.RandomState(1))
+    Rows, Columns = Solver.matrix_clues(grid)
+    print('Parallel line solving of %dx%d nonogram' % (size, size))
+    one = bench('parallel_solve, 1 process',
+                lambda: parallel_solve(Rows, Columns, 1), number=1)
+    cores = os.cpu_count()
+    many = bench('parallel_solve, %d processes' % cores,
+                 lambda: parallel_solve(Rows, Columns, cores), number=1)
+    print('%-40s %10.1f x' % ('speedup', one / many))
+
+
+if __name__ == '__main__':
+    bench_clues()
+    bench_verifier()
+    bench_line_engines()
+    bench_parallel()
@@ -0,0 +1,209 @@
+from Nonogram import Solver
+from Nonogram.SAT import SatNonogram
+from collections import defaultdict
+import numpy as np
+import itertools
+import math
+import time
+
+
+def random_puzzle(random, max_size=5):
+    '''
+    Returns (Rows, Columns) of random grid of random size
+    (from 1x1 to max_size x max_size) and density
+    '''
+    height, width = random.randint(1, max_size + 1, size=2)
+    grid = np.where(random.random_sample((height, width)) <
+                    random.uniform(0.2, 0.8), 1, -1)
+    return [Solver.row_to_clues(row) for row in grid], \
+        [Solver.row_to_clues(column) for column in grid.T]
+
+
+def all_solutions(Rows, Columns):
+    '''
+    Ground truth: every picture matching clues, found without the
+    solver - rows are all lines matching their clues (row_to_clues
+    of every possible line) and every combination of rows is checked
+    by clues of columns. Returns sorted list of matrices (as tuples).
+    '''
+    width = len(Columns)
+    lines = defaultdict(list)
+    for line in itertools.product((1, -1), repeat=width):
+        lines[tuple(Solver.row_to_clues(line))].append(line)
+    columns = [tuple(column) for column in Columns]
+    return sorted(rows for rows in
+                  itertools.product(*[lines[tuple(row)] for row in Rows])
+                  if [tuple(Solver.row_to_clues(column))
+                      for column in zip(*rows)] == columns)
+
+
+def filled_cells(matrix):
+    '''Numbers of filled cells as in brutforce_unique'''
+    return tuple(i * len(row) + j for i, row in enumerate(matrix)
+                 for j, value in enumerate(row) if value == 1)
+
+
+def line_solved_with(Rows, Columns, cells):
+    '''Picture which line solver gives with given cells, or None'''
+    NG = Solver.nonogram(Rows, Columns)
+    board = np.zeros((len(Rows), len(Columns)), dtype=int)
+    for i, j, value in cells:
+        board[i][j] = value
+    try:
+        NG.seed(board)
+    except Solver.ContradictionError:
+        return None
+    NG.solve()
+    return tuple(map(tuple, NG.nonogram_Matrix)) if NG.solved() else None
+
+
+def check_solve(Rows, Columns, truth):
+    '''Cells found by line solver are the same in every solution'''
+    NG = Solver.nonogram(Rows, Columns)
+    if NG.solve() != Solver.CONVERGED:
+        return 'solve gave %s' % NG.status
+    for i, row in enumerate(NG.nonogram_Matrix):
+        for j, value in enumerate(row):
+            if value and any(solution[i][j] != value for solution in truth):
+                return 'solve decided cell (%d, %d) wrongly' % (i, j)
+    if NG.solved() and len(truth) > 1:
+        return 'solve finished nonogram with %d solutions' % len(truth)
+
+
+def check_full_solve(Rows, Columns, truth):
+    '''
+    full_solve gives one of solutions; line solver with its hints
+    (or pair) gives the same picture
+    '''
+    NG = Solver.nonogram(Rows, Columns)
+    NG.full_solve()
+    status = NG.analyse().status
+    solution = tuple(map(tuple, NG.nonogram_Matrix))
+    if solution not in truth:
+        return 'full_solve (%s) gave picture which is no solution' % status
+    if status == 'unique' and len(truth) > 1:
+        return 'full_solve called nonogram with %d solutions unique' \
+            % len(truth)
+    if status == 'nonunique':
+        if line_solved_with(Rows, Columns, NG.hints) != solution:
+            return 'hints %s do not give the solution' % NG.hints
+        if NG.pair != [-1, -1] and line_solved_with(
+                Rows, Columns, [NG.pair + [1]]) != solution:
+            return 'pair %s does not give the solution' % NG.pair
+    if status == 'hard':
+        return 'full_solve called solvable nonogram hard'
+
+
+def check_uniqueness(Rows, Columns, truth):
+    '''True only for nonograms which line solver finishes'''
+    unique = Solver.check_uniqueness(Rows, Columns)
+    if unique != (line_solved_with(Rows, Columns, []) is not None):
+        return 'check_uniqueness gave %s' % unique
+    if unique and len(truth) > 1:
+        return 'check_uniqueness: %d solutions' % len(truth)
+
+
+def check_uniquisation(Rows, Columns, truth):
+    '''Filling pair gives a solution with line solver'''
+    pair = Solver.uniquisation(Rows, Columns)
+    if pair != [-1, -1] and \
+       line_solved_with(Rows, Columns, [pair + [1]]) not in truth:
+        return 'uniquisation gave %s' % pair
+
+
+def check_brutforce(Rows, Columns, truth, options=10 ** 5):
+    '''
+    brutforce_unique finds exactly all solutions. It tries every
+    way to fill cells of a component which line solver left, so
+    nonograms with more than given number of options are skipped.
+    '''
+    NG = Solver.nonogram(Rows, Columns)
+    NG.solve()
+    for group in Solver.components(NG):
+        rows = {i for i, _ in group}
+        need = sum(sum(Rows[i]) for i in rows) - \
+            sum(NG.nonogram_Matrix[i].count(1) for i in rows)
+        if math.comb(len(group), need) > options:
+            return None
+    found = Solver.brutforce_unique(Solver.nonogram(Rows, Columns))
+    if found != sorted(filled_cells(solution) for solution in truth):
+        return 'brutforce_unique found %d of %d solutions' \
+            % (len(found), len(truth))
+
+
+def check_count(Rows, Columns, truth):
+    '''count_solutions counts all solutions and gives one of them'''
+    NG = Solver.nonogram(Rows, Columns)
+    NG.solve()
+    count, found = Solver.count_solutions(NG, limit=len(truth) + 1)
+    if count != len(truth):
+        return 'count_solutions counted %d of %d' % (count, len(truth))
+    solution = [list(row) for row in NG.nonogram_Matrix]
+    for (i, j), value in found.items():
+        solution[i][j] = value
+    if tuple(map(tuple, solution)) not in truth:
+        return 'count_solutions gave picture which is no solution'
+
+
+def check_sat(Rows, Columns, truth):
+    '''SAT solver finds a solution and knows if it is the only one'''
+    sat = SatNonogram(Rows, Columns)
+    solution = sat.solve()
+    if solution is None or tuple(map(tuple, solution)) not in truth:
+        return 'SatNonogram.solve gave %s' % solution
+    if sat.unique() != (len(truth) == 1):
+        return 'SatNonogram.unique: %d solutions' % len(truth)
+
+
+CHECKS = [('solve', check_solve), ('full_solve', check_full_solve),
+          ('check_uniqueness', check_uniqueness),
+          ('uniquisation', check_uniquisation),
+          ('brutforce_unique', check_brutforce),
+          ('count_solutions', check_count), ('SatNonogram', check_sat)]
+
+
+def fuzz(count=200, max_size=5, seed=0):
+    '''
+    Checks every solver path on count random nonograms against
+    ground truth (all_solutions). Returns list of failures as
+    (path, Rows, Columns, message) and dict with time spent by
+    every path.
+    '''
+    random = np.random.RandomState(seed)
+    failures, times = [], defaultdict(float)
+    for _ in range(count):
+        Rows, Columns = random_puzzle(random, max_size)
+        truth = all_solutions(Rows, Columns)
+        for name, check in CHECKS:
+            start = time.perf_counter()
+            try:
+                message = check(Rows, Columns, truth)
+            except Exception as error:
+                message = '%s: %s' % (type(error).__name__, error)
+            times[name] += time.perf_counter() - start
+            if message is not None:
+                failures.append((name, Rows, Columns, message))
+    return failures, times
+
+
+def report(failures, times, count):
+    '''Prints failures and throughput of every path'''
+    for name, Rows, Columns, message in failures:
+        print('%s %s %s: %s' % (name, Rows, Columns, message))
+    for name, _ in CHECKS:
+        failed = len([f for f in failures if f[0] == name])
+        print('%-20s %10.1f puzzles/s %6d failed'
+              % (name, count / max(times[name], 1e-9), failed))
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Checks solver paths '
+                                     'against each other on random '
+                                     'small nonograms')
+    parser.add_argument('count', type=int, nargs='?', default=200)
+    parser.add_argument('--max-size', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    failures, times = fuzz(args.count, args.max_size, args.seed)
+    report(failures, times, args.count)
@@ -1,5 +1,18 @@
 from Nonogram import Solver
+from Nonogram.Hints import HintEngine
+from Nonogram import Generator
+from Nonogram.Parallel import parallel_solve
+from Nonogram.Index import PuzzleIndex
+from Nonogram.Library import Library
+from Nonogram.Grid import PackedGrid
+from Nonogram.SAT import SatNonogram, to_dimacs
+import Solver_fuzz
+import numpy as np
 import unittest
+import pickle
+import tempfile
+import stat
+import os
 
 
 class funcTestCase(unittest.TestCase):
@@ -30,6 +43,302 @@ class funcTestCase(unittest.TestCase):
         self.assertEqual(Solver.row_to_clues([-1, -1, -1, -1, -1, -1, -1, -1,
                                               -1, -1]), [0])
 
+    def test_matrix_to_clues(self):
+        matrix = np.random.RandomState(0).choice([-1, 1], size=(12, 9))
+        self.assertEqual(Solver.matrix_to_clues(matrix),
+                         [Solver.row_to_clues(x) for x in matrix])
+        self.assertEqual(Solver.matrix_to_clues(matrix.T),
+                         [Solver.row_to_clues(x) for x in matrix.T])
+
+    def test_line_tracker(self):
+        tracker = Solver.LineTracker([[1], [2]], [[2], [1]])
+        matrix = [[1, 0], [1, 0]]
+        self.assertEqual(tracker.update(matrix, 1, 0), [('column', 0, True)])
+        self.assertEqual(tracker.update(matrix, 0, 0), [('row', 0, True)])
+        self.assertFalse(tracker.done())
+        matrix[1][1] = 1
+        tracker.update(matrix, 1, 1)
+        self.assertTrue(tracker.done())
+        matrix[1][1] = -1
+        tracker.update(matrix, 1, 1)
+        self.assertEqual(tracker.satisfied, 2)
+
+    def test_mistake_checker(self):
+        self.assertTrue(Solver.line_fits([1, 2], [0, 0, 0, 0]))
+        self.assertFalse(Solver.line_fits([1, 2], [0, 0, -1, 0]))
+        self.assertFalse(Solver.line_fits([0], [0, 1]))
+        checker = Solver.MistakeChecker([[1], [2]], [[2], [1]])
+        board = [[1, 1], [0, 0]]
+        self.assertEqual(checker.update(board, 0, 1), [('row', 0, True)])
+        board[0][1] = -1
+        self.assertEqual(checker.update(board, 0, 1), [('row', 0, False)])
+        self.assertEqual(checker.wrong, set())
+
+    def test_hint_engine(self):
+        engine = HintEngine([[1], [2]], [[2], [1]])
+        board = np.zeros((2, 2), dtype=np.int8)
+        hint = engine.hint(board)
+        while hint is not None:
+            row, column, value, line = hint
+            self.assertIn(line, [('row', row), ('column', column)])
+            board[row][column] = value
+            hint = engine.hint(board)
+        self.assertEqual(board.tolist(), [[1, -1], [1, 1]])
+        board[0][1] = 1
+        self.assertRaises(Solver.ContradictionError, engine.hint, board)
+
+    def test_solve_steps(self):
+        grid = Generator.random_grid(12, 12, random=np.random.RandomState(3))
+        Rows, Columns = Solver.matrix_clues(grid)
+        NG = Solver.nonogram(Rows, Columns)
+        NG.solve()
+        steps = Solver.nonogram(Rows, Columns)
+        first = next(steps.solve_steps())
+        self.assertEqual(first.reason, 'clues')
+        self.assertTrue(steps.pending)
+        cells = list(first.cells)
+        for step in steps.solve_steps():
+            self.assertIn(step.line[0], ('row', 'column'))
+            cells += step.cells
+        self.assertEqual(len(cells), len(set((i, j) for i, j, _ in cells)))
+        board = np.zeros((12, 12), dtype=int)
+        for i, j, value in cells:
+            board[i][j] = value
+        self.assertEqual(board.tolist(), NG.nonogram_Matrix)
+        self.assertEqual(steps.pending, [])
+        engine = HintEngine(Rows, Columns)
+        cells, line = engine.line_hint(np.zeros((12, 12), dtype=np.int8))
+        self.assertTrue(all(line in [('row', i), ('column', j)]
+                            for i, j, _ in cells))
+
+    def test_fuzz(self):
+        Rows, Columns = [[1], [1]], [[1], [1]]
+        self.assertEqual(Solver_fuzz.all_solutions(Rows, Columns),
+                         [((-1, 1), (1, -1)), ((1, -1), (-1, 1))])
+        failures, times = Solver_fuzz.fuzz(30, 4, seed=1)
+        self.assertEqual(failures, [])
+        self.assertEqual(set(times),
+                         {name for name, _ in Solver_fuzz.CHECKS})
+
+    def test_check_uniqueness(self):
+        self.assertTrue(Solver.check_uniqueness([[0], [0]], [[0], [0]]))
+        self.assertTrue(Solver.check_uniqueness([[2], [2]], [[2], [2]]))
+        self.assertFalse(Solver.check_uniqueness([[1], [1]], [[1], [1]]))
+
+    def test_import_budget(self):
+        grid = Generator.random_grid(25, 25, random=np.random.RandomState(1))
+        Rows, Columns = Solver.matrix_clues(grid)
+        with tempfile.TemporaryDirectory() as directory:
+            file = os.path.join(directory, 'base.txt')
+            with open(file, 'w') as f:
+                f.write(Solver.clues_to_text(Rows, Columns))
+            Nonograms = Solver.import_from_file(file, work=100)
+        self.assertEqual(len(Nonograms['hard']), 1)
+
+    def test_rate_difficulty(self):
+        self.assertFalse(Solver.rate_difficulty([[2], [1]],
+                                                [[1], [2]]).capped)
+        grid = Generator.random_grid(25, 25, random=np.random.RandomState(1))
+        rating = Solver.rate_difficulty(*Solver.matrix_clues(grid),
+                                        work=500)
+        self.assertTrue(rating.capped)
+        self.assertLessEqual(rating.lines, 500)
+        self.assertGreater(rating.rounds, 0)
+        self.assertGreaterEqual(rating.score, rating.rounds)
+
+    def test_generator(self):
+        Rows, Columns, rounds = Generator.generate_one((3, 6, 5, 0.5, 0, 1,
+                                                        None, None, 100))
+        self.assertEqual((len(Rows), len(Columns)), (6, 5))
+        self.assertTrue(Solver.check_uniqueness(Rows, Columns))
+        self.assertIsNone(Generator.generate_one((3, 2, 2, 0.5, 0, 50,
+                                                  None, None, 5)))
+        picture = np.ones((4, 4), dtype=int)
+        Rows, Columns, rounds = Generator.generate_one((3, 4, 4, 0.5, 0, 1,
+                                                        None, picture, 5))
+        self.assertEqual(Rows, [[4]] * 4)
+
+    def test_seed_and_state(self):
+        Nonogram = Solver.nonogram([[1], [1]], [[1], [1]])
+        self.assertEqual(Nonogram.seed([[1, 0], [0, 0]]),
+                         [(0, 1, -1), (1, 0, -1), (1, 1, 1)])
+        self.assertRaises(Solver.ContradictionError, Nonogram.seed,
+                          [[0, 1], [0, 0]])
+        Nonogram = Solver.nonogram([[1], [1]], [[1], [1]])
+        Nonogram.seed([[0, -1], [0, 0]])
+        with tempfile.TemporaryDirectory() as directory:
+            file = os.path.join(directory, 'state.json')
+            Nonogram.save_state(file)
+            loaded = Solver.nonogram.load_state(file)
+        self.assertEqual(loaded.to_matrix(), [[1, -1], [-1, 1]])
+        Nonogram = Solver.nonogram([[2], [1]], [[1], [2]], 'sets')
+        Nonogram.limit(100)
+        Nonogram.solve(budget=1)
+        with tempfile.TemporaryDirectory() as directory:
+            file = os.path.join(directory, 'state.json')
+            Nonogram.save_state(file)
+            loaded = Solver.nonogram.load_state(file, budget=0)
+            self.assertEqual(loaded.pending, Nonogram.pending)
+            self.assertEqual((loaded.engine, loaded.work), ('sets', [99]))
+            self.assertEqual(loaded.status, Solver.BUDGET)
+            loaded = Solver.nonogram.load_state(file)
+        self.assertEqual(loaded.status, Solver.CONVERGED)
+        self.assertEqual(loaded.to_matrix(), [[1, 1], [-1, 1]])
+        Nonogram = Solver.nonogram([[1, 1], [2], [3]], [[2], [3], [2]])
+        self.assertEqual(Nonogram.solve(), Solver.CONTRADICTION)
+        with tempfile.TemporaryDirectory() as directory:
+            file = os.path.join(directory, 'state.json')
+            Nonogram.save_state(file)
+            loaded = Solver.nonogram.load_state(file)
+        self.assertEqual(loaded.status, Solver.CONTRADICTION)
+        self.assertFalse(loaded.solved())
+
+    def test_parallel_solve(self):
+        grid = parallel_solve([[1], [2]], [[2], [1]], processes=2)
+        self.assertEqual(grid.tolist(), [[1, -1], [1, 1]])
+        self.assertRaises(Solver.ContradictionError, parallel_solve,
+                          [[2], [2], [0]], [[2], [1], [1]], 1)
+        Nonogram = Solver.nonogram([[1], [2]], [[2], [1]])
+        self.assertEqual(Nonogram.solve_parallel(2), Solver.CONVERGED)
+        self.assertEqual((Nonogram.nonogram_Matrix, Nonogram.lineSolves),
+                         ([[1, -1], [1, 1]], 0))
+        self.assertEqual(Nonogram.solve(), Solver.CONVERGED)
+
+    def test_line_engines(self):
+        for clues, line in [([3, 1], [0, 0, 0, 0, 0, 0]),
+                            ([1, 2], [0, 1, 0, 0, -1, 0]),
+                            ([2], [1, 0, 0, 0])]:
+            results = []
+            for engine in ('sets', 'dp'):
+                row = Solver.Row(len(line), clues, engine)
+                for place, value in enumerate(line):
+                    if value:
+                        row.cells[place] = {x for x in row.cells[place]
+                                            if x * value > 0}
+                row.solve()
+                results.append([Solver.cell_value(x) for x in row.cells])
+            self.assertEqual(results[0], results[1])
+        self.assertEqual(Solver.line_solve([3, 1], [0, 0, 0, 0, 0, 0]),
+                         [0, 1, 1, 0, 0, 0])
+        self.assertIsNone(Solver.line_solve([3], [0, -1, 0, 0]))
+
+    def test_puzzle_index(self):
+        Index = PuzzleIndex()
+        Rows, Columns = [[2], [1], [0]], [[1], [2]]
+        self.assertTrue(Index.add(Rows, Columns))
+        self.assertFalse(Index.add(Rows, Columns))
+        self.assertTrue(Index.add([[0], [1], [2]], [[2], [1]]))
+        self.assertNotIn(([[2], [1], [0]], [[2], [1]]), Index)
+        self.assertEqual(len(Index), 2)
+        Index.remember(Rows, Columns, 'unique',
+                       [[1, 1], [-1, 1], [-1, -1]], [0, 1], [[2, 0, -1]])
+        self.assertEqual(Index.recall([[1], [2]], [[2], [1], [0]]),
+                         {'status': 'unique',
+                          'solution': [[1, -1, -1], [1, 1, -1]],
+                          'pair': [1, 0], 'hints': [[0, 2, -1]]})
+        with tempfile.TemporaryDirectory() as directory:
+            file = os.path.join(directory, 'base.txt')
+            with open(file, 'w') as f:
+                f.write(Solver.clues_to_text([[1], [2]], [[2], [1], [0]]))
+            Nonograms = Solver.import_from_file(file, Index)
+        self.assertEqual(len(Nonograms['unique']), 1)
+        self.assertEqual(Nonograms['unique'][0].analyse().solution,
+                         [[1, -1, -1], [1, 1, -1]])
+
+    def test_packed_grid(self):
+        matrix = np.random.RandomState(2).randint(-1, 2, (7, 9))
+        grid = PackedGrid(matrix)
+        self.assertEqual(grid.tolist(), matrix.tolist())
+        self.assertEqual(np.asarray(grid).tolist(), matrix.tolist())
+        self.assertEqual(grid[3, 8], matrix[3][8])
+        self.assertEqual(len(grid.to_bytes()), 16)
+        self.assertEqual(pickle.loads(pickle.dumps(grid)), grid)
+        self.assertEqual(PackedGrid.from_bytes(grid.shape, grid.to_bytes()),
+                         grid)
+        Nonogram = Solver.nonogram([[2], [1]], [[1], [2]])
+        Nonogram.solve()
+        self.assertEqual(Nonogram.grid().tolist(), Nonogram.nonogram_Matrix)
+        verifier = Solver.ClueVerifier([[2], [1]], [[1], [2]])
+        self.assertTrue(verifier.check(Nonogram.grid()))
+
+    def test_library(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file = os.path.join(directory, 'base.txt')
+            library = Library(file)
+            self.assertTrue(library.add([[2], [1]], [[1], [2]]))
+            self.assertFalse(library.add([[2], [1]], [[1], [2]]))
+            self.assertTrue(library.add([[1], [2]], [[2], [1]]))
+            self.assertTrue(library.add([[1]], [[1]]))
+            with open(file, 'a') as f:
+                f.write('\n\n[[1],[0]]\n[[1')
+            self.assertEqual(list(Solver.read_clues(file)),
+                             [([[2], [1]], [[1], [2]]),
+                              ([[1], [2]], [[2], [1]]), ([[1]], [[1]])])
+            self.assertTrue(Library(file).add([[0]], [[0]]))
+            self.assertEqual(len(list(Solver.read_clues(file))), 4)
+            os.chmod(file, 0o644)
+            library = Library(file)
+            library.compact()
+            self.assertEqual(stat.S_IMODE(os.stat(file).st_mode), 0o644)
+            self.assertEqual(len(library), 4)
+            self.assertEqual(os.listdir(directory), ['base.txt'])
+            self.assertEqual(sum(len(x) for x in
+                                 Solver.import_from_file(file).values()), 4)
+
+    def test_sat(self):
+        random = np.random.RandomState(0)
+        for _ in range(20):
+            grid = Generator.random_grid(6, 5, 0.5, random)
+            Rows, Columns = Solver.matrix_clues(grid)
+            solution = SatNonogram(Rows, Columns).solve()
+            self.assertTrue(Solver.ClueVerifier(Rows, Columns)
+                            .check(solution))
+        self.assertTrue(SatNonogram([[2], [1]], [[1], [2]]).unique())
+        self.assertFalse(SatNonogram([[1], [1]], [[1], [1]]).unique())
+        self.assertIsNone(SatNonogram([[2], [2], [0]],
+                                      [[2], [1], [1]]).solve())
+        with tempfile.TemporaryDirectory() as directory:
+            file = os.path.join(directory, 'nonogram.cnf')
+            to_dimacs([[1]], [[1]], file)
+            with open(file) as f:
+                self.assertIn('p cnf', f.read())
+
+    def test_components(self):
+        Nonogram = Solver.nonogram([[1], [1, 1], [2, 3], [2, 1, 1],
+                                    [1, 1, 1], [1]],
+                                   [[3], [3], [0], [3], [1, 1], [5]])
+        Nonogram.solve()
+        self.assertEqual(len(Solver.components(Nonogram)), 2)
+        self.assertEqual(Solver.count_solutions(Nonogram, 100)[0], 4)
+        self.assertEqual(len(Solver.brutforce_unique(Nonogram)), 4)
+        analysis = Nonogram.analyse()
+        self.assertEqual(analysis.status, 'nonunique')
+        self.assertEqual(len(analysis.hints), 2)
+
+    def test_minimal_hints(self):
+        random = np.random.RandomState(5)
+        for _ in range(10):
+            grid = Generator.random_grid(10, 10, random=random)
+            Rows, Columns = Solver.matrix_clues(grid)
+            Nonogram = Solver.nonogram(Rows, Columns)
+            Nonogram.solve()
+            hints = Solver.minimal_hints(Nonogram, grid)
+            board = np.zeros((10, 10), dtype=int)
+            for i, j, value in hints:
+                self.assertEqual(value, grid[i][j])
+                board[i][j] = value
+            Nonogram = Solver.nonogram(Rows, Columns)
+            Nonogram.seed(board)
+            Nonogram.solve()
+            self.assertTrue(Nonogram.solved())
+            self.assertEqual(Nonogram.nonogram_Matrix, grid.tolist())
+        Nonogram = Solver.nonogram([[1], [1]], [[1], [1]])
+        Nonogram.solve()
+        count, solution = Solver.count_solutions(Nonogram)
+        self.assertEqual(count, 2)
+        self.assertEqual(solution, {(0, 0): 1, (0, 1): -1,
+                                    (1, 0): -1, (1, 1): 1})
+
 
 suite = unittest.TestLoader().loadTestsFromTestCase(funcTestCase)
 print(unittest.TextTestRunner(verbosity=3).run(suite))